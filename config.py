@@ -73,6 +73,21 @@ class Config:
     MAX_PROMPT_LENGTH = 5000
     DEFAULT_TIMEOUT = 30
     
+    # LLM response cache (exact-match, in-process)
+    LLM_CACHE_SIZE = 2048
+    LLM_CACHE_TTL = 1800  # seconds
+    
+    # Persistent sanitizability verdicts, keyed by model and prompt hash
+    # (kept beside this file so the location doesn't depend on the working directory)
+    SANITIZABILITY_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sanitizability_cache.json")
+    SANITIZABILITY_CACHE_TTL = 86400  # seconds
+    
+    # Maximum concurrent Gemini requests for batch enhancement
+    GEMINI_CONCURRENCY = int(os.getenv('GEMINI_CONCURRENCY', '8'))
+    
+    # Application log sink: a file when set, stdout otherwise
+    LOG_FILE = os.getenv('ISTVON_LOG_FILE')
+    
     # Domain-specific configurations
     DOMAIN_CONFIGS = {
         "technical": {
@@ -5,13 +5,21 @@ ISTVON Enhancement Engine
 Core engine modules for processing natural language prompts into ISTVON JSON format.
 """
 
-from .istvon_schema import ISTVONSchema
-from .pattern_matchers import ISTVONPatternMatcher
-from .context_analyzers import ContextAnalyzer
-from .completion_rules import ISTVONCompletionEngine
-from .llm_mapper import LLMISTVONMapper
-from .rule_engine import ISTVONRuleEngine
-from .broker import ISTVONBroker, BrokerDecision
+import importlib
+
+# Exports are resolved on first access, so importing one engine submodule
+# (e.g. engine.pattern_matchers) doesn't pull in the LLM mapper and broker
+_EXPORTS = {
+    'ISTVONSchema': '.istvon_schema',
+    'ISTVONPatternMatcher': '.pattern_matchers',
+    'ContextAnalyzer': '.context_analyzers',
+    'ISTVONCompletionEngine': '.completion_rules',
+    'LLMISTVONMapper': '.llm_mapper',
+    'ISTVONRuleEngine': '.rule_engine',
+    'ISTVONBroker': '.broker',
+    'BrokerDecision': '.broker',
+    'RiskLevel': '.broker'
+}
 
 __all__ = [
     'ISTVONSchema',
@@ -21,5 +29,19 @@ __all__ = [
     'LLMISTVONMapper',
     'ISTVONRuleEngine',
     'ISTVONBroker',
-    'BrokerDecision'
+    'BrokerDecision',
+    'RiskLevel'
 ]
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,6 +1,7 @@
 
-from typing import Dict, Any, List, Tuple
-from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+from enum import Enum, IntEnum
+from bisect import bisect_right
 import re
 import json
 import sys
@@ -8,11 +9,8 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.json_logger import RuleEngineLogger
-from .pattern_matchers import ISTVONPatternMatcher
-from .context_analyzers import ContextAnalyzer
 from .llm_mapper import LLMISTVONMapper
-from .completion_rules import ISTVONCompletionEngine
-from .istvon_schema import ISTVONSchema
+from .rule_engine import _PATTERN_MATCHER, _CONTEXT_ANALYZER, _COMPLETION_ENGINE, _SCHEMA_VALIDATOR
 
 
 class BrokerDecision(Enum):
@@ -22,15 +20,27 @@ class BrokerDecision(Enum):
     BLOCK = "BLOCK"           # Too dangerous, block completely
 
 
+class RiskLevel(IntEnum):
+    """Ordered safety risk levels, so decisions compare ints rather than strings"""
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+
 class ISTVONBroker:
 
-    def __init__(self):
-        self.pattern_matcher = ISTVONPatternMatcher()
-        self.context_analyzer = ContextAnalyzer()
-        self.llm_mapper = LLMISTVONMapper()
-        self.completion_engine = ISTVONCompletionEngine()
-        self.schema_validator = ISTVONSchema()
-        self.json_logger = RuleEngineLogger()
+    def __init__(self, llm_mapper: Optional[LLMISTVONMapper] = None,
+                 json_logger: Optional[RuleEngineLogger] = None):
+        self.pattern_matcher = _PATTERN_MATCHER
+        self.context_analyzer = _CONTEXT_ANALYZER
+        self.llm_mapper = llm_mapper if llm_mapper is not None else LLMISTVONMapper()
+        self.completion_engine = _COMPLETION_ENGINE
+        self.schema_validator = _SCHEMA_VALIDATOR
+        self.json_logger = json_logger if json_logger is not None else RuleEngineLogger()
 
         # Build precompiled unsafe pattern lists (single words use word boundaries)
         self.unsafe_patterns = {
@@ -121,28 +131,90 @@ class ISTVONBroker:
             "recommendations": self._get_recommendations(decision, safety_result, costar_gaps)
         }
 
+    def analyze_prompt_batch(self, prompts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze many prompts at once; results mirror analyze_prompt for each row.
+
+        Prompts are joined with a NUL sentinel so every compiled pattern scans
+        one buffer instead of being re-run per prompt. Match offsets are mapped
+        back to their row by bisecting the row start offsets.
+        """
+        if not prompts:
+            return []
+
+        joined = "\x00".join(prompts)
+        row_starts = []
+        offset = 0
+        for prompt in prompts:
+            row_starts.append(offset)
+            offset += len(prompt) + 1
+
+        def row_of(pos: int) -> int:
+            return bisect_right(row_starts, pos) - 1
+
+        # Step 1: Safety analysis (allowlisted rows are treated as safe)
+        allowed = set()
+        for allow_re in self.allowlist_patterns:
+            for m in allow_re.finditer(joined):
+                allowed.add(row_of(m.start()))
+
+        row_issues = [[] for _ in prompts]
+        for category, patterns in self.compiled_unsafe.items():
+            for cre in patterns:
+                for m in cre.finditer(joined):
+                    row = row_of(m.start())
+                    if row in allowed:
+                        continue
+                    row_start = row_starts[row]
+                    row_end = row_start + len(prompts[row])
+
+                    # Same 40-char window as _analyze_safety, clipped to the row
+                    window = joined[max(row_start, m.start() - 40):min(row_end, m.end() + 40)]
+                    span = (m.start() - row_start, m.end() - row_start)
+                    row_issues[row].append(self._build_issue(category, cre, m.group(0), span, window))
+
+        # Step 2: COSTAR gap analysis
+        row_present = [set() for _ in prompts]
+        for element, pattern_list in self.costar_gaps.items():
+            for p in pattern_list:
+                for m in p.finditer(joined):
+                    row_present[row_of(m.start())].add(element)
+
+        results = []
+        for row, prompt in enumerate(prompts):
+            safety_result = self._summarize_safety(row_issues[row])
+            costar_gaps = self._summarize_costar_gaps(
+                [element for element in self.costar_gaps if element not in row_present[row]]
+            )
+
+            # Step 3: Context analysis
+            context = self.context_analyzer.analyze_prompt_context(prompt)
+
+            # Step 4: Make broker decision
+            decision = self._make_broker_decision(safety_result, costar_gaps, context)
+
+            results.append({
+                "decision": decision,
+                "safety_analysis": safety_result,
+                "costar_gaps": costar_gaps,
+                "context": context,
+                "recommendations": self._get_recommendations(decision, safety_result, costar_gaps)
+            })
+
+        return results
+
     def _analyze_safety(self, prompt: str) -> Dict[str, Any]:
         """Analyze prompt for unsafe content with context-aware filtering"""
-        prompt_lower = prompt.lower()
         issues = []
-        total_score = 0
 
         # Quick allowlist short-circuit: if any allowlist full-pattern matches the prompt, treat as safe
         for allow_re in self.allowlist_patterns:
             if allow_re.search(prompt):
-                return {
-                    "risk_level": "low",
-                    "issues": [],
-                    "is_safe": True,
-                    "score": 0,
-                    "matches": []
-                }
+                return self._summarize_safety([])
 
         # For every compiled pattern, find matches but skip them if context indicates mitigation intent
         for category, patterns in self.compiled_unsafe.items():
             for cre in patterns:
                 for m in cre.finditer(prompt):
-                    match_text = m.group(0)
                     span = m.span()
 
                     # Check for allowlist in a small window (20 chars before/after)
@@ -150,59 +222,69 @@ class ISTVONBroker:
                     window_end = min(len(prompt), span[1] + 40)
                     window = prompt[window_start:window_end]
 
-                    # If mitigation indicators are present in the window, treat as a benign context
-                    if any(r.search(window) for r in self.mitigation_res):
-                        # lower severity: record but with reduced score
-                        issue_score = max(1, int(self.severity_score_map.get(category, 1) / 2))
-                        issues.append({
-                            "category": category,
-                            "pattern": cre.pattern,
-                            "match": match_text,
-                            "span": span,
-                            "severity": "low_context",
-                            "score": issue_score,
-                            "context_window": window.strip()
-                        })
-                        total_score += issue_score
-                        continue
+                    issues.append(self._build_issue(category, cre, m.group(0), span, window))
+
+        return self._summarize_safety(issues)
+
+    def _build_issue(self, category: str, cre, match_text: str, span: Tuple[int, int], window: str) -> Dict[str, Any]:
+        """Score a single unsafe match, reducing severity when mitigation intent is nearby"""
+        # If mitigation indicators are present in the window, treat as a benign context
+        if any(r.search(window) for r in self.mitigation_res):
+            # lower severity: record but with reduced score
+            return {
+                "category": category,
+                "pattern": cre.pattern,
+                "match": match_text,
+                "span": span,
+                "severity": "low_context",
+                "score": max(1, int(self.severity_score_map.get(category, 1) / 2)),
+                "context_window": window.strip()
+            }
+
+        # Otherwise, normal handling
+        return {
+            "category": category,
+            "pattern": cre.pattern,
+            "match": match_text,
+            "span": span,
+            "severity": "normal",
+            "score": self.severity_score_map.get(category, 1)
+        }
 
-                    # Otherwise, normal handling
-                    issue_score = self.severity_score_map.get(category, 1)
-                    issues.append({
-                        "category": category,
-                        "pattern": cre.pattern,
-                        "match": match_text,
-                        "span": span,
-                        "severity": "normal",
-                        "score": issue_score
-                    })
-                    total_score += issue_score
+    def _summarize_safety(self, issues: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Turn scored issues into the safety result returned by _analyze_safety"""
+        total_score = sum(issue["score"] for issue in issues)
 
         # Determine overall risk level using numeric thresholds
         if total_score >= self._high_risk_threshold:
-            risk_level = "high"
+            risk = RiskLevel.HIGH
         elif total_score >= self._medium_risk_threshold:
-            risk_level = "medium"
+            risk = RiskLevel.MEDIUM
         else:
-            risk_level = "low"
+            risk = RiskLevel.LOW
 
         return {
-            "risk_level": risk_level,
+            "risk": risk,
+            "risk_level": risk.label,
             "issues": issues,
-            "is_safe": risk_level == "low",
+            "is_safe": risk == RiskLevel.LOW,
             "score": total_score,
             "matches": issues  # keep same field name for compatibility
         }
 
     def _analyze_costar_gaps(self, prompt: str) -> Dict[str, Any]:
         """Analyze for COSTAR gaps (missing critical elements) using compiled patterns"""
-        prompt_lower = prompt.lower()
         gaps = []
 
+        # Patterns are compiled case-insensitive, so scan the original prompt
         for element, pattern_list in self.costar_gaps.items():
-            if not any(p.search(prompt_lower) for p in pattern_list):
+            if not any(p.search(prompt) for p in pattern_list):
                 gaps.append(element)
 
+        return self._summarize_costar_gaps(gaps)
+
+    def _summarize_costar_gaps(self, gaps: List[str]) -> Dict[str, Any]:
+        """Turn missing COSTAR elements into the result returned by _analyze_costar_gaps"""
         completeness_score = (len(self.costar_gaps) - len(gaps)) / len(self.costar_gaps)
         return {
             "missing_elements": gaps,
@@ -212,12 +294,17 @@ class ISTVONBroker:
 
     def _make_broker_decision(self, safety_result: Dict, costar_gaps: Dict, context: Dict) -> BrokerDecision:
         """Make broker decision based on analysis"""
+        # Hand-built safety dicts may carry only the risk_level label
+        risk = safety_result.get("risk")
+        if risk is None:
+            risk = RiskLevel[safety_result["risk_level"].upper()]
+
         # Block if high risk
-        if safety_result["risk_level"] == "high":
+        if risk >= RiskLevel.HIGH:
             return BrokerDecision.BLOCK
 
         # Needs fix if medium risk or very significant gaps
-        if (safety_result["risk_level"] == "medium" or
+        if (risk >= RiskLevel.MEDIUM or
                 costar_gaps["completeness_score"] < self._completeness_threshold):
             return BrokerDecision.NEEDS_FIX
 
@@ -1,5 +1,7 @@
 # engine/completion_rules.py
 from typing import Dict, List, Any
+from utils.helpers import HelperFunctions
+from .istvon_schema import DEFAULT_INSTRUCTIONS, default_outcome
 
 class ISTVONCompletionEngine:
     """Apply rules to complete partial ISTVON mappings"""
@@ -11,7 +13,7 @@ class ISTVONCompletionEngine:
         
         # Ensure Instructions (I) are complete
         if not completed_map.get("I") or len(completed_map["I"]) == 0:
-            completed_map["I"] = ["Execute the requested task effectively"]
+            completed_map["I"] = list(DEFAULT_INSTRUCTIONS)
         
         # Enhance Instructions based on domain and context
         completed_map["I"] = self._enhance_instructions(completed_map["I"], context)
@@ -22,11 +24,7 @@ class ISTVONCompletionEngine:
         
         # Ensure Outcome (O) is specified
         if not completed_map.get("O"):
-            completed_map["O"] = {
-                "format": "Text response",
-                "delivery": "Inline display",
-                "success_criteria": ["Meets user requirements", "High quality output"]
-            }
+            completed_map["O"] = default_outcome()
         else:
             # Enhance existing outcome
             completed_map["O"] = self._enhance_outcome(completed_map["O"], context)
@@ -105,7 +103,7 @@ class ISTVONCompletionEngine:
             enhanced["success_criteria"].extend(domain_criteria[domain])
         
         # Ensure uniqueness
-        enhanced["success_criteria"] = list(set(enhanced["success_criteria"]))
+        enhanced["success_criteria"] = HelperFunctions.dedup_ordered(enhanced["success_criteria"])
         
         return enhanced
     
@@ -115,12 +113,12 @@ class ISTVONCompletionEngine:
         
         # Apply tool defaults if no tools specified
         if not result.get("T") and domain_rules.get("default_tools"):
-            result["T"] = domain_rules["default_tools"]
+            result["T"] = list(domain_rules["default_tools"])
         
         # Enhance existing tools with domain defaults
         elif result.get("T") and domain_rules.get("default_tools"):
             result["T"].extend(domain_rules["default_tools"])
-            result["T"] = list(set(result["T"]))  # Remove duplicates
+            result["T"] = HelperFunctions.dedup_ordered(result["T"])  # Remove duplicates
         
         return result
     
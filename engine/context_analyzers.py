@@ -1,5 +1,44 @@
 # engine/context_analyzer.py
-from typing import Dict, Any
+import copy
+import re
+from typing import Dict, Any, List
+
+
+def _keyword_regex(words: List[str]):
+    """Compile one word-boundary alternation for a keyword group (longest first)"""
+    alternation = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+    return re.compile(r"\b(?:" + alternation + r")\b")
+
+
+# Domain-specific ISTVON defaults, looked up by _apply_domain_rules
+DOMAIN_RULES = {
+    "technical": {
+        "default_tools": ["Code formatting", "Documentation standards", "Technical writing"],
+        "default_outcome": {"format": "Technical document", "delivery": "Structured format"},
+        "common_variables": {"complexity": "Technical", "format": "Markdown/Code"}
+    },
+    "business": {
+        "default_tools": ["Business frameworks", "Professional templates", "Industry standards"],
+        "default_outcome": {"format": "Business document", "delivery": "Professional format"},
+        "common_variables": {"tone": "Professional", "length": "Comprehensive"}
+    },
+    "creative": {
+        "default_tools": ["Creative writing techniques", "Style guides", "Literary devices"],
+        "default_outcome": {"format": "Creative content", "delivery": "Engaging format"},
+        "common_variables": {"tone": "Engaging", "format": "Narrative"}
+    },
+    "academic": {
+        "default_tools": ["Academic standards", "Citation formats", "Research methodologies"],
+        "default_outcome": {"format": "Academic paper", "delivery": "Formal structure"},
+        "common_variables": {"tone": "Formal", "complexity": "Detailed"}
+    },
+    "communication": {
+        "default_tools": ["Communication templates", "Professional etiquette", "Format guidelines"],
+        "default_outcome": {"format": "Communication document", "delivery": "Direct delivery"},
+        "common_variables": {"tone": "Appropriate", "length": "Concise"}
+    }
+}
+
 
 class ContextAnalyzer:
     """Analyze prompt context for better ISTVON mapping"""
@@ -18,16 +57,25 @@ class ContextAnalyzer:
             "medium": ["detailed", "comprehensive", "analysis", "explain"],
             "complex": ["thorough", "in-depth", "research", "strategic", "comprehensive analysis"]
         }
+        self.specific_indicators = ["specific", "detailed", "particular", "exact"]
+        
+        # One C-level scan per group instead of one substring search per keyword
+        self._complexity_re = {
+            level: _keyword_regex(indicators)
+            for level, indicators in self.complexity_indicators.items()
+        }
+        self._specific_re = _keyword_regex(self.specific_indicators)
     
     def analyze_prompt_context(self, prompt: str) -> Dict[str, Any]:
         """Analyze prompt context for better ISTVON mapping"""
         prompt_lower = prompt.lower()
+        domain = self._identify_domain(prompt_lower)
         
         return {
-            "domain": self._identify_domain(prompt_lower),
+            "domain": domain,
             "complexity": self._assess_complexity(prompt_lower),
             "specificity": self._measure_specificity(prompt_lower),
-            "domain_specific_rules": self._apply_domain_rules(prompt_lower)
+            "domain_specific_rules": self._apply_domain_rules(prompt_lower, domain)
         }
     
     def _identify_domain(self, prompt: str) -> str:
@@ -45,9 +93,9 @@ class ContextAnalyzer:
         """Assess the complexity level of the prompt"""
         complexity_scores = {}
         
-        for level, indicators in self.complexity_indicators.items():
-            score = sum(1 for indicator in indicators if indicator in prompt)
-            complexity_scores[level] = score
+        for level, indicator_re in self._complexity_re.items():
+            # Count each indicator once, as the keyword lists are presence-based
+            complexity_scores[level] = len(set(indicator_re.findall(prompt)))
         
         best_complexity = max(complexity_scores, key=complexity_scores.get)
         return best_complexity if complexity_scores[best_complexity] > 0 else "medium"
@@ -55,10 +103,9 @@ class ContextAnalyzer:
     def _measure_specificity(self, prompt: str) -> str:
         """Measure how specific/detailed the prompt is"""
         word_count = len(prompt.split())
-        specific_indicators = ["specific", "detailed", "particular", "exact"]
         
         specificity_score = word_count / 10  # Normalize
-        specificity_score += sum(1 for indicator in specific_indicators if indicator in prompt) * 2
+        specificity_score += len(set(self._specific_re.findall(prompt))) * 2
         
         if specificity_score > 3:
             return "high"
@@ -67,36 +114,7 @@ class ContextAnalyzer:
         else:
             return "low"
     
-    def _apply_domain_rules(self, prompt: str) -> Dict[str, Any]:
+    def _apply_domain_rules(self, prompt: str, domain: str) -> Dict[str, Any]:
         """Apply domain-specific rules for ISTVON mapping"""
-        domain = self._identify_domain(prompt)
-        
-        domain_rules = {
-            "technical": {
-                "default_tools": ["Code formatting", "Documentation standards", "Technical writing"],
-                "default_outcome": {"format": "Technical document", "delivery": "Structured format"},
-                "common_variables": {"complexity": "Technical", "format": "Markdown/Code"}
-            },
-            "business": {
-                "default_tools": ["Business frameworks", "Professional templates", "Industry standards"],
-                "default_outcome": {"format": "Business document", "delivery": "Professional format"},
-                "common_variables": {"tone": "Professional", "length": "Comprehensive"}
-            },
-            "creative": {
-                "default_tools": ["Creative writing techniques", "Style guides", "Literary devices"],
-                "default_outcome": {"format": "Creative content", "delivery": "Engaging format"},
-                "common_variables": {"tone": "Engaging", "format": "Narrative"}
-            },
-            "academic": {
-                "default_tools": ["Academic standards", "Citation formats", "Research methodologies"],
-                "default_outcome": {"format": "Academic paper", "delivery": "Formal structure"},
-                "common_variables": {"tone": "Formal", "complexity": "Detailed"}
-            },
-            "communication": {
-                "default_tools": ["Communication templates", "Professional etiquette", "Format guidelines"],
-                "default_outcome": {"format": "Communication document", "delivery": "Direct delivery"},
-                "common_variables": {"tone": "Appropriate", "length": "Concise"}
-            }
-        }
-        
-        return domain_rules.get(domain, {})
\ No newline at end of file
+        # Each analysis gets its own copy so callers can't alter the shared table
+        return copy.deepcopy(DOMAIN_RULES.get(domain, {}))
\ No newline at end of file
@@ -1,6 +1,23 @@
 # engine/istvon_schema.py
+from types import MappingProxyType
 from config import Config
 
+# Shared read-only defaults; callers get fresh copies via default_outcome()
+DEFAULT_INSTRUCTIONS = ("Execute the requested task effectively",)
+DEFAULT_OUTCOME = MappingProxyType({
+    "format": "Text response",
+    "delivery": "Inline display",
+    "success_criteria": ("Meets user requirements", "High quality output")
+})
+
+
+def default_outcome() -> dict:
+    """Return a mutable copy of the default Outcome (O) block"""
+    outcome = dict(DEFAULT_OUTCOME)
+    outcome["success_criteria"] = list(DEFAULT_OUTCOME["success_criteria"])
+    return outcome
+
+
 class ISTVONSchema:
     """ISTVON JSON schema definition and validation"""
     
@@ -28,12 +45,8 @@ class ISTVONSchema:
     
     def _get_default_value(self, key: str):
         """Get default values for required ISTVON fields"""
-        defaults = {
-            "I": ["Execute the requested task effectively"],
-            "O": {
-                "format": "Text response",
-                "delivery": "Inline display",
-                "success_criteria": ["Meets user requirements", "High quality output"]
-            }
-        }
-        return defaults.get(key, None)
\ No newline at end of file
+        if key == "I":
+            return list(DEFAULT_INSTRUCTIONS)
+        if key == "O":
+            return default_outcome()
+        return None
\ No newline at end of file
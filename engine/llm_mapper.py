@@ -1,26 +1,119 @@
 # engine/llm_mapper.py
+import asyncio
+import functools
+import hashlib
 import json
-import re
-from typing import Dict, Any
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from config import Config
+from utils.helpers import HelperFunctions
+from utils.json_cache import JSONFileCache
+from utils.json_parser import extract_json_slice
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps_bytes = orjson.dumps
+    
+    def _json_dumps_sorted(obj: Any) -> str:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    
+    def _json_dumps_sorted(obj: Any) -> str:
+        return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+# Stable part of the enhancement prompt; only _dynamic_tail varies per request
+_ENHANCEMENT_PREFIX = """
+You are an ISTVON framework expert. Enhance the preliminary ISTVON mapping given below.
+
+ENHANCEMENT TASKS:
+1. Complete missing ISTVON elements intelligently based on the prompt
+2. Improve instructions to be clear and actionable
+3. Suggest appropriate tools and variables for the domain
+4. Define clear outcomes and success criteria
+5. Keep the response structured and machine-readable
+
+Return ONLY valid JSON matching this exact ISTVON schema:
+{
+    "I": ["array of instruction strings"],
+    "S": {"documents": [], "urls": [], "data_points": {}},
+    "T": ["array of tool strings"],
+    "V": {"tone": "", "length": "", "complexity": "", "format": ""},
+    "O": {"format": "", "delivery": "", "success_criteria": []},
+    "N": {"milestones": [], "completion_notice": false}
+}
+
+Return ONLY the JSON, no explanations or additional text.
+"""
+
+
+def _load_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Parse a JSON object, trying the whole (stripped) text before slicing out {...}"""
+    # Happy path: the model returned bare JSON as instructed, so no scan or copy
+    try:
+        parsed = _json_loads(text.strip())
+        if isinstance(parsed, dict):
+            return parsed
+    except json.JSONDecodeError:
+        pass
+    
+    json_str = extract_json_slice(text)
+    return _json_loads(json_str) if json_str else None
+
+
+def _load_response_object(text: str) -> Optional[Dict[str, Any]]:
+    """_load_json_object that reports malformed JSON as None instead of raising"""
+    try:
+        return _load_json_object(text)
+    except json.JSONDecodeError:
+        return None
+
 
 class LLMISTVONMapper:
     """Use Gemini AI to enhance ISTVON mapping with fallback"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None,
+                 sanitizability_cache_file: Optional[str] = Config.SANITIZABILITY_CACHE_FILE):
         self.api_key = api_key or Config.GEMINI_API_KEY
-        self.model = None
         
+        # Sanitizability verdicts persist across runs; None disables the disk cache
+        self._sanitizability_cache = (
+            JSONFileCache(sanitizability_cache_file, ttl=Config.SANITIZABILITY_CACHE_TTL)
+            if sanitizability_cache_file else None
+        )
+        
+        # Parsed LLM responses keyed by SHA256 of the request material
+        self._response_cache = OrderedDict()
+        # Mappers are shared across request threads; guards every cache access
+        self._response_cache_lock = threading.Lock()
+        
+        # asyncio semaphores are bound to one event loop, so keep one per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+    
+    @functools.cached_property
+    def model(self):
+        """Gemini model, imported and configured on first use; None if unavailable"""
         # Only initialize Gemini if API key is valid
-        if self.api_key and self.api_key != 'your-gemini-api-key-here':
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel(Config.DEFAULT_MODEL)
-            except ImportError:
-                print("Warning: google-generativeai not available. Using rule-based fallback.")
-            except Exception as e:
-                print(f"Warning: Gemini initialization failed: {e}. Using rule-based fallback.")
+        if not self.api_key or self.api_key == 'your-gemini-api-key-here':
+            return None
+        
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            return genai.GenerativeModel(Config.DEFAULT_MODEL)
+        except ImportError:
+            print("Warning: google-generativeai not available. Using rule-based fallback.")
+        except Exception as e:
+            print(f"Warning: Gemini initialization failed: {e}. Using rule-based fallback.")
+        return None
     
     def enhance_mapping(self, natural_prompt: str, preliminary_map: Dict, context_analysis: Dict) -> Dict:
         """Use LLM to enhance and complete ISTVON mapping with fallback"""
@@ -28,60 +121,145 @@ class LLMISTVONMapper:
         if not self.model:
             return preliminary_map  # Fallback if no LLM available
         
-        system_prompt = self._build_enhancement_prompt(natural_prompt, preliminary_map, context_analysis)
+        # Only the dynamic tail varies per request, so it alone keys the cache
+        tail = self._dynamic_tail(natural_prompt, preliminary_map, context_analysis)
         
         try:
-            response = self.model.generate_content(system_prompt)
-            enhanced_map = self._parse_llm_response(response.text)
+            enhanced_map = self._cached_generate(
+                "enhance",
+                tail,
+                lambda: _ENHANCEMENT_PREFIX + tail,
+                _load_response_object
+            )
+            if enhanced_map is None:
+                return preliminary_map  # Unparseable reply; nothing to merge
             return self._merge_mappings(preliminary_map, enhanced_map)
         except Exception as e:
             print(f"LLM enhancement failed: {e}. Using rule-based mapping.")
             return preliminary_map  # Fallback to rule-based mapping
     
-    def _build_enhancement_prompt(self, prompt: str, preliminary_map: Dict, context: Dict) -> str:
-        return f"""
-        You are an ISTVON framework expert. Enhance the preliminary ISTVON mapping.
+    def enhance_mapping_batch(self, items: List[Tuple[str, Dict, Dict]]) -> List[Dict]:
+        """Enhance several (prompt, preliminary_map, context) items with concurrent LLM calls"""
         
-        NATURAL PROMPT: "{prompt}"
+        if not self.model or not items:
+            return [preliminary_map for _, preliminary_map, _ in items]  # Fallback if no LLM available
         
-        PRELIMINARY MAPPING (rule-based):
-        {json.dumps(preliminary_map, indent=2)}
+        return asyncio.run(self._enhance_mapping_gather(items))
+    
+    async def _enhance_mapping_gather(self, items: List[Tuple[str, Dict, Dict]]) -> List[Dict]:
+        """Issue all enhancement requests at once, bounded by Config.GEMINI_CONCURRENCY"""
+        # gather preserves input order, so results line up with items
+        return await asyncio.gather(*(self.enhance_mapping_async(*item) for item in items))
+    
+    async def enhance_mapping_async(self, natural_prompt: str, preliminary_map: Dict, context_analysis: Dict) -> Dict:
+        """Async variant of enhance_mapping for running alongside other LLM calls"""
         
-        CONTEXT ANALYSIS:
-        - Domain: {context.get('domain', 'general')}
-        - Complexity: {context.get('complexity', 'medium')}
-        - Specificity: {context.get('specificity', 'medium')}
+        if not self.model:
+            return preliminary_map  # Fallback if no LLM available
         
-        ENHANCEMENT TASKS:
-        1. Complete missing ISTVON elements intelligently based on the prompt
-        2. Improve instructions to be clear and actionable
-        3. Suggest appropriate tools and variables for the domain
-        4. Define clear outcomes and success criteria
-        5. Keep the response structured and machine-readable
+        tail = self._dynamic_tail(natural_prompt, preliminary_map, context_analysis)
         
-        Return ONLY valid JSON matching this exact ISTVON schema:
-        {{
-            "I": ["array of instruction strings"],
-            "S": {{"documents": [], "urls": [], "data_points": {{}}}},
-            "T": ["array of tool strings"],
-            "V": {{"tone": "", "length": "", "complexity": "", "format": ""}},
-            "O": {{"format": "", "delivery": "", "success_criteria": []}},
-            "N": {{"milestones": [], "completion_notice": false}}
-        }}
+        try:
+            enhanced_map = await self._cached_generate_async(
+                "enhance",
+                tail,
+                lambda: _ENHANCEMENT_PREFIX + tail,
+                _load_response_object
+            )
+            if enhanced_map is None:
+                return preliminary_map  # Unparseable reply; nothing to merge
+            return self._merge_mappings(preliminary_map, enhanced_map)
+        except Exception as e:
+            print(f"LLM enhancement failed: {e}. Using rule-based mapping.")
+            return preliminary_map  # Fallback to rule-based mapping
+    
+    def _cached_generate(self, kind: str, key_material: str,
+                         build_prompt: Callable[[], str],
+                         parse: Callable[[str], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Call Gemini through an exact-match LRU cache of parsed responses.
         
-        Return ONLY the JSON, no explanations or additional text.
+        parse returns None when the reply holds no usable JSON object; such
+        replies are not cached, and None is returned so the caller falls back.
         """
+        key = self._cache_key(kind, key_material)
+        
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        response = self.model.generate_content(build_prompt())
+        return self._cache_put(key, parse(response.text))
+    
+    async def _cached_generate_async(self, kind: str, key_material: str,
+                                     build_prompt: Callable[[], str],
+                                     parse: Callable[[str], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Async _cached_generate; concurrent requests are bounded per event loop"""
+        key = self._cache_key(kind, key_material)
+        
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        async with self._get_semaphore():
+            response = await self.model.generate_content_async(build_prompt())
+        return self._cache_put(key, parse(response.text))
+    
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Concurrency limiter for the running event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(Config.GEMINI_CONCURRENCY)
+        return semaphore
+    
+    def _cache_key(self, kind: str, key_material: str) -> str:
+        return hashlib.sha256(f"{kind}\x00{key_material}".encode("utf-8")).hexdigest()
+    
+    def _cache_get(self, key: str):
+        """Return a fresh dict for a live cached response, or None on miss/expiry"""
+        with self._response_cache_lock:
+            cached = self._response_cache.get(key)
+            if cached is None or time.monotonic() - cached[0] >= Config.LLM_CACHE_TTL:
+                return None
+            self._response_cache.move_to_end(key)
+        # Entries are stored encoded, so each hit decodes into a dict the caller owns
+        return _json_loads(cached[1])
+    
+    def _cache_put(self, key: str, parsed: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Store a parsed response, evicting the least recently used entries"""
+        if parsed is None:
+            return None  # Parse failures are retried next time, never cached
+        entry = (time.monotonic(), _json_dumps_bytes(parsed))
+        with self._response_cache_lock:
+            self._response_cache[key] = entry
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > Config.LLM_CACHE_SIZE:
+                self._response_cache.popitem(last=False)
+        return parsed
+    
+    def _build_enhancement_prompt(self, prompt: str, preliminary_map: Dict, context: Dict) -> str:
+        return _ENHANCEMENT_PREFIX + self._dynamic_tail(prompt, preliminary_map, context)
+    
+    def _dynamic_tail(self, prompt: str, preliminary_map: Dict, context: Dict) -> str:
+        """Format the per-request part of the enhancement prompt (also the cache key material)"""
+        return f"""
+NATURAL PROMPT: "{prompt}"
+
+PRELIMINARY MAPPING (rule-based):
+{_json_dumps_sorted(preliminary_map)}
+
+CONTEXT ANALYSIS:
+- Domain: {context.get('domain', 'general')}
+- Complexity: {context.get('complexity', 'medium')}
+- Specificity: {context.get('specificity', 'medium')}
+"""
     
     def _parse_llm_response(self, response_text: str) -> Dict[str, Any]:
         """Parse LLM response to extract JSON"""
         try:
             # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                return json.loads(json_str)
-            else:
-                return {}
+            result = _load_json_object(response_text)
+            return result if result is not None else {}
         except json.JSONDecodeError:
             return {}
     
@@ -92,8 +270,8 @@ class LLMISTVONMapper:
         for key in llm_enhanced:
             if key in merged:
                 if isinstance(merged[key], list) and isinstance(llm_enhanced[key], list):
-                    # Merge lists, avoiding duplicates
-                    merged[key] = list(set(merged[key] + llm_enhanced[key]))
+                    # Merge lists, avoiding duplicates but keeping order
+                    merged[key] = HelperFunctions.dedup_ordered(merged[key] + llm_enhanced[key])
                 elif isinstance(merged[key], dict) and isinstance(llm_enhanced[key], dict):
                     # Merge dictionaries
                     merged[key].update(llm_enhanced[key])
@@ -111,15 +289,58 @@ class LLMISTVONMapper:
         if not self.model:
             return {"sanitizable": True, "reason": "LLM not available, assuming sanitizable"}  # Fallback
         
-        validation_prompt = self._build_validation_prompt(prompt)
+        store_key = self._sanitizability_key(prompt)
+        stored = self._sanitizability_cache.get(store_key) if self._sanitizability_cache else None
+        if stored is not None:
+            return stored
+        
+        try:
+            result = self._cached_generate(
+                "validate",
+                prompt,
+                lambda: self._build_validation_prompt(prompt),
+                self._parse_verdict
+            )
+            if result is None:
+                return {"sanitizable": True, "reason": "Could not parse LLM response"}
+            if self._sanitizability_cache:
+                self._sanitizability_cache.set(store_key, result)
+            return result
+        except Exception as e:
+            print(f"LLM validation failed: {e}. Assuming sanitizable.")
+            return {"sanitizable": True, "reason": "LLM validation failed, assuming sanitizable"}
+    
+    async def validate_sanitizability_async(self, prompt: str) -> Dict[str, Any]:
+        """Async variant of validate_sanitizability for running alongside other LLM calls"""
+        
+        if not self.model:
+            return {"sanitizable": True, "reason": "LLM not available, assuming sanitizable"}  # Fallback
+        
+        store_key = self._sanitizability_key(prompt)
+        stored = self._sanitizability_cache.get(store_key) if self._sanitizability_cache else None
+        if stored is not None:
+            return stored
         
         try:
-            response = self.model.generate_content(validation_prompt)
-            return self._parse_validation_response(response.text)
+            result = await self._cached_generate_async(
+                "validate",
+                prompt,
+                lambda: self._build_validation_prompt(prompt),
+                self._parse_verdict
+            )
+            if result is None:
+                return {"sanitizable": True, "reason": "Could not parse LLM response"}
+            if self._sanitizability_cache:
+                self._sanitizability_cache.set(store_key, result)
+            return result
         except Exception as e:
             print(f"LLM validation failed: {e}. Assuming sanitizable.")
             return {"sanitizable": True, "reason": "LLM validation failed, assuming sanitizable"}
     
+    def _sanitizability_key(self, prompt: str) -> str:
+        """Persistent cache key; includes the model so upgrades invalidate old verdicts"""
+        return f"{Config.DEFAULT_MODEL}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}"
+    
     def _build_validation_prompt(self, prompt: str) -> str:
         return f"""
         You are a content safety validator. Analyze if the following prompt can be sanitized to be safe and appropriate.
@@ -147,14 +368,20 @@ class LLMISTVONMapper:
         Return ONLY the JSON, no explanations or additional text.
         """
     
+    def _parse_verdict(self, response_text: str) -> Optional[Dict[str, Any]]:
+        """Parse a validation reply, or None if it holds no verdict"""
+        result = _load_response_object(response_text)
+        if not isinstance(result, dict) or "sanitizable" not in result:
+            return None  # Only real verdicts may be cached or persisted
+        result.setdefault("reason", "No reason provided")
+        return result
+    
     def _parse_validation_response(self, response_text: str) -> Dict[str, Any]:
         """Parse LLM validation response"""
         try:
             # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                result = json.loads(json_str)
+            result = _load_json_object(response_text)
+            if result is not None:
                 # Ensure required fields exist
                 if "sanitizable" not in result:
                     result["sanitizable"] = True
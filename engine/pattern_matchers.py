@@ -2,6 +2,12 @@
 import re
 from typing import Dict, List, Any
 
+# Ad-hoc patterns used directly by the extractors
+_URL_RE = re.compile(r'https?://\S+', re.IGNORECASE)
+_TONE_RE = re.compile(r'tone:\s*(\w+)', re.IGNORECASE)
+_LENGTH_RE = re.compile(r'(\d+\s+words|\d+\s+pages)', re.IGNORECASE)
+_FORMAT_RE = re.compile(r'as\s+a\s+(\w+)', re.IGNORECASE)
+
 class ISTVONPatternMatcher:
     """Extract ISTVON elements using pattern matching"""
     
@@ -54,18 +60,35 @@ class ISTVONPatternMatcher:
             "updates": [r"notify\s+me", r"send\s+updates", r"progress\s+report", r"keep me informed"],
             "milestones": [r"when\s+done", r"after\s+each\s+step", r"milestone", r"upon completion"]
         }
+        
+        # Presence-only groups fold into one alternation, so a single scan answers "any match?"
+        self._tone_any_re = self._compile_any(self.variable_patterns["tone"])
+        self._updates_any_re = self._compile_any(self.notification_patterns["updates"])
+        # Literal anchor every "updates" pattern contains; prompts with none skip the regex
+        self._notification_prefilter_re = re.compile(r"notify|send|progress|keep me informed", re.IGNORECASE)
+        
+        # Compile every pattern once so extractors reuse the Pattern objects
+        for groups in (self.instruction_patterns, self.source_patterns, self.tool_patterns,
+                       self.variable_patterns, self.outcome_patterns, self.notification_patterns):
+            for name, patterns in groups.items():
+                groups[name] = [re.compile(p, re.IGNORECASE) for p in patterns]
+    
+    @staticmethod
+    def _compile_any(patterns: List[str]):
+        """Compile a pattern list into one case-insensitive alternation"""
+        return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
     
     def extract_istvon_elements(self, prompt: str) -> Dict[str, Any]:
         """Extract ISTVON elements using pattern matching"""
-        prompt_lower = prompt.lower()
-        
+        # Patterns are compiled case-insensitive, so scan the original prompt
+        # (keeps URL and proper-noun casing intact)
         return {
-            "I": self._extract_instructions(prompt_lower),
-            "S": self._extract_source_data(prompt_lower),
-            "T": self._extract_tools(prompt_lower),
-            "V": self._extract_variables(prompt_lower),
-            "O": self._extract_outcome(prompt_lower),
-            "N": self._extract_notification(prompt_lower)
+            "I": self._extract_instructions(prompt),
+            "S": self._extract_source_data(prompt),
+            "T": self._extract_tools(prompt),
+            "V": self._extract_variables(prompt),
+            "O": self._extract_outcome(prompt),
+            "N": self._extract_notification(prompt)
         }
     
     def _extract_instructions(self, prompt: str) -> List[str]:
@@ -74,7 +97,7 @@ class ISTVONPatternMatcher:
         
         # Extract action verbs and their objects
         for pattern in self.instruction_patterns["action_verbs"]:
-            matches = re.findall(pattern, prompt)
+            matches = pattern.findall(prompt)
             for match in matches:
                 if isinstance(match, tuple):
                     instruction = " ".join([m for m in match if m]).strip()
@@ -85,7 +108,7 @@ class ISTVONPatternMatcher:
         
         # Add quality indicators to instructions
         for pattern in self.instruction_patterns["quality_indicators"]:
-            matches = re.findall(pattern, prompt)
+            matches = pattern.findall(prompt)
             for match in matches:
                 if match:
                     instructions.append(f"Ensure {match} quality")
@@ -99,12 +122,12 @@ class ISTVONPatternMatcher:
         # Check for document references
         doc_matches = []
         for pattern in self.source_patterns["documents"]:
-            doc_matches.extend(re.findall(pattern, prompt))
+            doc_matches.extend(pattern.findall(prompt))
         if doc_matches:
             sources["documents"] = list(set(doc_matches))
         
         # Check for URLs
-        url_matches = re.findall(r'https?://[^\s]+', prompt)
+        url_matches = _URL_RE.findall(prompt)
         if url_matches:
             sources["urls"] = url_matches
         
@@ -115,11 +138,11 @@ class ISTVONPatternMatcher:
         tools = []
         
         for pattern in self.tool_patterns["frameworks"]:
-            matches = re.findall(pattern, prompt)
+            matches = pattern.findall(prompt)
             tools.extend(matches)
         
         for pattern in self.tool_patterns["styles"]:
-            matches = re.findall(pattern, prompt)
+            matches = pattern.findall(prompt)
             tools.extend([f"Use {match} style" for match in matches if match])
         
         return list(set(tools))
@@ -129,16 +152,15 @@ class ISTVONPatternMatcher:
         variables = {}
         
         # Extract tone
-        tone_matches = re.findall(r'tone:\s*(\w+)', prompt)
+        tone_matches = _TONE_RE.findall(prompt)
         if tone_matches:
             variables["tone"] = tone_matches[0]
         else:
-            for pattern in self.variable_patterns["tone"]:
-                if re.search(pattern, prompt):
-                    variables["tone"] = "professional"  # Default
+            if self._tone_any_re.search(prompt):
+                variables["tone"] = "professional"  # Default
         
         # Extract length
-        length_match = re.search(r'(\d+\s+words|\d+\s+pages)', prompt)
+        length_match = _LENGTH_RE.search(prompt)
         if length_match:
             variables["length"] = length_match.group()
         
@@ -148,7 +170,7 @@ class ISTVONPatternMatcher:
         """Extract outcome specifications"""
         outcome = {}
         
-        format_matches = re.findall(r'as\s+a\s+(\w+)', prompt)
+        format_matches = _FORMAT_RE.findall(prompt)
         if format_matches:
             outcome["format"] = format_matches[0].capitalize()
         
@@ -158,7 +180,7 @@ class ISTVONPatternMatcher:
         """Extract notification preferences"""
         notification = {}
         
-        if any(re.search(pattern, prompt) for pattern in self.notification_patterns["updates"]):
+        if self._notification_prefilter_re.search(prompt) and self._updates_any_re.search(prompt):
             notification["completion_notice"] = True
         
         return notification
\ No newline at end of file
@@ -1,28 +1,38 @@
 # engine/rule_engine.py
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from .pattern_matchers import ISTVONPatternMatcher
 from .context_analyzers import ContextAnalyzer
 from .llm_mapper import LLMISTVONMapper
 from .completion_rules import ISTVONCompletionEngine
 from .istvon_schema import ISTVONSchema
 
+# Stateless after construction (compiled patterns and lookup tables only), so
+# every engine and broker shares one instance; re Pattern objects are thread-safe
+_PATTERN_MATCHER = ISTVONPatternMatcher()
+_CONTEXT_ANALYZER = ContextAnalyzer()
+_COMPLETION_ENGINE = ISTVONCompletionEngine()
+_SCHEMA_VALIDATOR = ISTVONSchema()
+
 class ISTVONRuleEngine:
     """Main rule engine for ISTVON mapping"""
     
-    def __init__(self, use_llm: bool = True):
-        self.pattern_matchers = ISTVONPatternMatcher()
-        self.context_analyzer = ContextAnalyzer()
-        self.completion_engine = ISTVONCompletionEngine()
-        self.schema_validator = ISTVONSchema()
+    def __init__(self, use_llm: bool = True, llm_mapper: Optional[LLMISTVONMapper] = None):
+        self.pattern_matchers = _PATTERN_MATCHER
+        self.context_analyzer = _CONTEXT_ANALYZER
+        self.completion_engine = _COMPLETION_ENGINE
+        self.schema_validator = _SCHEMA_VALIDATOR
         
-        # Initialize LLM mapper only if needed and API key is available
+        # Initialize LLM mapper only if needed (an injected mapper takes precedence)
         self.use_llm = use_llm
-        self.llm_mapper = LLMISTVONMapper() if use_llm else None
+        if llm_mapper is not None:
+            self.llm_mapper = llm_mapper
+        else:
+            self.llm_mapper = LLMISTVONMapper() if use_llm else None
     
     def map_to_istvon(self, natural_prompt: str) -> Dict[str, Any]:
         """Map natural language prompt to ISTVON JSON"""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
             # Step 1: Basic pattern matching
@@ -30,9 +40,11 @@ class ISTVONRuleEngine:
             
             # Step 2: Context analysis
             context_analysis = self.context_analyzer.analyze_prompt_context(natural_prompt)
+            domain = context_analysis.get("domain", "general")
             
             # Step 3: LLM-enhanced mapping for complex cases (if enabled)
-            if self.use_llm and self.llm_mapper and self._needs_llm_assistance(preliminary_map, context_analysis):
+            needs_llm, llm_reason = self._llm_gate(preliminary_map, context_analysis)
+            if needs_llm:
                 enhanced_map = self.llm_mapper.enhance_mapping(
                     natural_prompt, preliminary_map, context_analysis
                 )
@@ -46,41 +58,144 @@ class ISTVONRuleEngine:
             # Step 5: Schema validation
             validated_map = self.schema_validator.validate_istvon(completed_map)
             
-            processing_time = int((time.time() - start_time) * 1000)
+            processing_time = self._elapsed_ms(start_ns)
             
             return {
                 "success": True,
                 "istvon_json": validated_map,
                 "processing_time_ms": processing_time,
-                "domain": context_analysis.get("domain", "general"),
-                "used_llm": self.use_llm and self._needs_llm_assistance(preliminary_map, context_analysis)
+                "domain": domain,
+                "used_llm": needs_llm,
+                "llm_reason": llm_reason
             }
             
         except Exception as e:
-            processing_time = int((time.time() - start_time) * 1000)
+            return self._error_result(e, start_ns)
+    
+    async def map_to_istvon_async(self, natural_prompt: str) -> Dict[str, Any]:
+        """Async map_to_istvon; the LLM step awaits instead of blocking the event loop"""
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            preliminary_map = self.pattern_matchers.extract_istvon_elements(natural_prompt)
+            context_analysis = self.context_analyzer.analyze_prompt_context(natural_prompt)
+            domain = context_analysis.get("domain", "general")
+            
+            needs_llm, llm_reason = self._llm_gate(preliminary_map, context_analysis)
+            if needs_llm:
+                final_map = await self.llm_mapper.enhance_mapping_async(
+                    natural_prompt, preliminary_map, context_analysis
+                )
+            else:
+                final_map = preliminary_map
+            
+            completed_map = self.completion_engine.apply_completion_rules(final_map, context_analysis)
+            validated_map = self.schema_validator.validate_istvon(completed_map)
+            
             return {
-                "success": False,
-                "error": str(e),
-                "processing_time_ms": processing_time,
-                "istvon_json": {}
+                "success": True,
+                "istvon_json": validated_map,
+                "processing_time_ms": self._elapsed_ms(start_ns),
+                "domain": domain,
+                "used_llm": needs_llm,
+                "llm_reason": llm_reason
             }
+            
+        except Exception as e:
+            return self._error_result(e, start_ns)
     
-    def _needs_llm_assistance(self, preliminary_map: Dict, context_analysis: Dict) -> bool:
-        """Determine if LLM assistance is needed"""
-        # Check if instructions are too vague
-        instructions = preliminary_map.get("I", [])
-        if not instructions or len(instructions) == 0:
-            return True
+    def map_to_istvon_batch(self, prompts: List[str]) -> List[Dict[str, Any]]:
+        """Map several prompts, sending all LLM-assisted ones as one concurrent batch.
+        
+        processing_time_ms is per prompt: its own rule-based steps plus, for
+        LLM-assisted prompts, the duration of the shared LLM round.
+        """
+        results = [None] * len(prompts)
+        staged = []
+        
+        # Steps 1-2: Pattern matching and context analysis for every prompt
+        for index, natural_prompt in enumerate(prompts):
+            start_ns = time.perf_counter_ns()
+            try:
+                preliminary_map = self.pattern_matchers.extract_istvon_elements(natural_prompt)
+                context_analysis = self.context_analyzer.analyze_prompt_context(natural_prompt)
+                needs_llm, llm_reason = self._llm_gate(preliminary_map, context_analysis)
+                staged.append((index, natural_prompt, preliminary_map, context_analysis, needs_llm, llm_reason,
+                               time.perf_counter_ns() - start_ns))
+            except Exception as e:
+                results[index] = self._error_result(e, start_ns)
+        
+        # Step 3: One batched LLM round for the prompts that need it
+        llm_items = [(natural_prompt, preliminary_map, context_analysis)
+                     for _, natural_prompt, preliminary_map, context_analysis, needs_llm, _, _ in staged if needs_llm]
+        llm_start_ns = time.perf_counter_ns()
+        try:
+            enhanced_maps = self.llm_mapper.enhance_mapping_batch(llm_items) if llm_items else []
+        except Exception as e:
+            # e.g. asyncio.run inside a running event loop: keep the rule-based maps
+            print(f"LLM batch enhancement failed: {e}. Using rule-based mapping.")
+            enhanced_maps = [preliminary_map for _, preliminary_map, _ in llm_items]
+        llm_ns = time.perf_counter_ns() - llm_start_ns
+        enhanced_maps = iter(enhanced_maps)
         
-        # Check if context suggests complexity
-        complexity = context_analysis.get("complexity", "medium")
-        specificity = context_analysis.get("specificity", "medium")
+        # Steps 4-5: Completion and schema validation
+        for index, _, preliminary_map, context_analysis, needs_llm, llm_reason, staged_ns in staged:
+            # Backdate the start so the elapsed time covers this prompt's earlier steps
+            start_ns = time.perf_counter_ns() - staged_ns - (llm_ns if needs_llm else 0)
+            try:
+                final_map = next(enhanced_maps) if needs_llm else preliminary_map
+                completed_map = self.completion_engine.apply_completion_rules(final_map, context_analysis)
+                validated_map = self.schema_validator.validate_istvon(completed_map)
+                
+                results[index] = {
+                    "success": True,
+                    "istvon_json": validated_map,
+                    "processing_time_ms": self._elapsed_ms(start_ns),
+                    "domain": context_analysis.get("domain", "general"),
+                    "used_llm": needs_llm,
+                    "llm_reason": llm_reason
+                }
+            except Exception as e:
+                results[index] = self._error_result(e, start_ns)
+        
+        return results
+    
+    @staticmethod
+    def _elapsed_ms(start_ns: int) -> int:
+        """Milliseconds since start_ns, from the monotonic perf counter"""
+        return (time.perf_counter_ns() - start_ns) // 1_000_000
+    
+    def _error_result(self, error: Exception, start_ns: int) -> Dict[str, Any]:
+        """Build the failure response shared by map_to_istvon and map_to_istvon_batch"""
+        return {
+            "success": False,
+            "error": str(error),
+            "processing_time_ms": self._elapsed_ms(start_ns),
+            "istvon_json": {}
+        }
+    
+    def _llm_gate(self, preliminary_map: Dict, context_analysis: Dict) -> Tuple[bool, Optional[str]]:
+        """Decide whether to call the LLM for this prompt, given engine settings"""
+        if not self.use_llm or self.llm_mapper is None:
+            return False, None
+        return self._needs_llm_assistance(preliminary_map, context_analysis)
+    
+    def _needs_llm_assistance(self, preliminary_map: Dict, context_analysis: Dict) -> Tuple[bool, Optional[str]]:
+        """Determine if LLM assistance is needed, returning (needs_llm, reason)"""
+        # Context checks first: already computed by the analyzer pass
+        if context_analysis.get("complexity", "medium") == "complex":
+            return True, "complex prompt"
+        if context_analysis.get("specificity", "medium") == "low":
+            return True, "low specificity"
         
-        if complexity == "complex" or specificity == "low":
-            return True
+        # Check if instructions are too vague
+        if not preliminary_map.get("I"):
+            return True, "no instructions extracted"
         
         # Check if critical elements are missing
-        if not preliminary_map.get("O") or not preliminary_map.get("V"):
-            return True
+        if not preliminary_map.get("O"):
+            return True, "missing outcome"
+        if not preliminary_map.get("V"):
+            return True, "missing variables"
         
-        return False
\ No newline at end of file
+        return False, None
\ No newline at end of file
@@ -1,18 +1,43 @@
 # tests/test_broker.py
 import unittest
 import sys
+import json
 import os
+import tempfile
+import time
+from unittest.mock import patch
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from engine.broker import ISTVONBroker, BrokerDecision
+from utils import json_logger
+from utils.json_logger import RuleEngineLogger
+
+class FakeLLMMapper:
+    """Deterministic stand-in for LLMISTVONMapper so tests never call Gemini"""
+    
+    def enhance_mapping(self, natural_prompt, preliminary_map, context_analysis):
+        return preliminary_map
+    
+    def validate_sanitizability(self, prompt):
+        return {"sanitizable": True, "reason": "test"}
 
 class TestBroker(unittest.TestCase):
     """Test broker functionality"""
     
-    def setUp(self):
-        self.broker = ISTVONBroker()
+    @classmethod
+    def setUpClass(cls):
+        # Broker holds no per-test state, so build it once for the class.
+        # Decisions go to a private log so parallel runs don't share a file.
+        cls._log_dir = tempfile.TemporaryDirectory()
+        cls.json_logger = RuleEngineLogger(os.path.join(cls._log_dir.name, "logs.json"))
+        cls.broker = ISTVONBroker(llm_mapper=FakeLLMMapper(), json_logger=cls.json_logger)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.json_logger.close()
+        cls._log_dir.cleanup()
     
     def test_safe_prompt(self):
         """Test broker with safe prompt"""
@@ -41,6 +66,21 @@ class TestBroker(unittest.TestCase):
         self.assertFalse(result["safety_analysis"]["is_safe"])
         self.assertEqual(result["safety_analysis"]["risk_level"], "medium")
     
+    def test_analyze_prompt_batch(self):
+        """Test batch analysis mirrors single-prompt analysis"""
+        prompts = [
+            "Write a professional email about product launch",
+            "Write code to hack into systems and steal data",
+            "Write about personal financial information",
+            "Plan a hackathon for students"
+        ]
+        results = self.broker.analyze_prompt_batch(prompts)
+        
+        self.assertEqual(len(results), len(prompts))
+        for prompt, result in zip(prompts, results):
+            self.assertEqual(result, self.broker.analyze_prompt(prompt))
+        self.assertEqual(self.broker.analyze_prompt_batch([]), [])
+    
     def test_costar_gaps_analysis(self):
         """Test COSTAR gaps analysis"""
         # Prompt with missing elements
@@ -146,5 +186,73 @@ class TestBroker(unittest.TestCase):
         self.assertGreater(len(recommendations), 0)
         self.assertTrue(any("Safe to proceed" in rec for rec in recommendations))
 
+    def test_make_broker_decision_from_risk_level_label(self):
+        """Test safety dicts without the RiskLevel field are decided from risk_level"""
+        complete = {"completeness_score": 1.0, "missing_elements": []}
+        
+        for risk_level, expected in [("high", BrokerDecision.BLOCK),
+                                     ("medium", BrokerDecision.NEEDS_FIX),
+                                     ("low", BrokerDecision.ALLOW)]:
+            safety_result = {"risk_level": risk_level, "is_safe": risk_level == "low"}
+            self.assertEqual(self.broker._make_broker_decision(safety_result, complete, {}), expected)
+
+class TestRuleEngineLogger(unittest.TestCase):
+    """Test JSON decision logger"""
+    
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.logger = RuleEngineLogger(os.path.join(tmp_dir.name, "logs.json"))
+        self.addCleanup(self.logger.close)
+    
+    def test_get_recent_logs_reads_tail(self):
+        """Test recent logs come back in order when the tail spans several chunks"""
+        for i in range(20):
+            self.logger.log_decision(f"prompt {i}", "ALLOW")
+        
+        with patch.object(json_logger, "_TAIL_CHUNK", 32):
+            recent = self.logger.get_recent_logs(limit=3)
+        
+        self.assertEqual([log["prompt"] for log in recent], ["prompt 17", "prompt 18", "prompt 19"])
+        self.assertEqual(len(self.logger.get_recent_logs(limit=50)), 20)
+    
+    def test_get_recent_logs_skips_blank_lines(self):
+        """Test blank lines in a legacy log don't shorten the tail"""
+        with open(self.logger.log_file, 'w') as f:
+            for i in range(5):
+                f.write(json.dumps({"verdict": "ALLOW", "prompt": f"prompt {i}"}) + "\n\n  \n")
+        
+        with patch.object(json_logger, "_TAIL_CHUNK", 16):
+            recent = self.logger.get_recent_logs(limit=3)
+        
+        self.assertEqual([log["prompt"] for log in recent], ["prompt 2", "prompt 3", "prompt 4"])
+    
+    def test_buffered_entries_flushed_by_timer(self):
+        """Test a burst smaller than a batch reaches the file without another write"""
+        with patch.object(json_logger, "_FLUSH_INTERVAL", 0.01):
+            self.logger.log_decision("prompt 0", "ALLOW")
+        
+        deadline = time.monotonic() + 2
+        while os.path.getsize(self.logger.log_file) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with open(self.logger.log_file, 'rb') as f:
+            self.assertIn(b'"prompt 0"', f.read())
+    
+    def test_get_logs_by_verdict_uses_index(self):
+        """Test verdict lookups survive a reload from the sidecar index"""
+        for i in range(6):
+            self.logger.log_decision(f"prompt {i}", "BLOCK" if i % 3 == 0 else "ALLOW")
+        self.logger.close()
+        
+        # A fresh writer rebuilds its offsets from the sidecar, then keeps appending
+        reloaded = RuleEngineLogger(self.logger.log_file)
+        self.addCleanup(reloaded.close)
+        reloaded.log_decision("prompt 6", "BLOCK")
+        
+        blocked = reloaded.get_logs_by_verdict("BLOCK")
+        self.assertEqual([log["prompt"] for log in blocked], ["prompt 0", "prompt 3", "prompt 6"])
+        self.assertEqual(len(reloaded.get_logs_by_verdict("ALLOW")), 4)
+        self.assertEqual(reloaded.get_logs_by_verdict("SANITIZE"), [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,21 +1,25 @@
 # tests/test_llm_mapper.py
+import asyncio
 import unittest
 import sys
 import os
-from unittest.mock import Mock, patch
+import tempfile
+from unittest.mock import AsyncMock, Mock, patch
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from engine.llm_mapper import LLMISTVONMapper
-from utils.json_parser import JSONParser
+from utils.json_parser import default_parser
 
 class TestLLMMapper(unittest.TestCase):
     """Test LLM mapper functionality"""
     
-    def setUp(self):
-        self.llm_mapper = LLMISTVONMapper()
-        self.json_parser = JSONParser()
+    @classmethod
+    def setUpClass(cls):
+        # Tests that mutate a mapper build their own, so these can be shared
+        cls.llm_mapper = LLMISTVONMapper(sanitizability_cache_file=None)
+        cls.json_parser = default_parser
     
     def test_initialization_without_api_key(self):
         """Test LLM mapper initialization without API key"""
@@ -48,6 +52,110 @@ class TestLLMMapper(unittest.TestCase):
         # Should return preliminary map when no model available
         self.assertEqual(result, preliminary_map)
     
+    def test_enhance_mapping_uses_response_cache(self):
+        """Test repeated enhancement requests hit the response cache"""
+        mapper = LLMISTVONMapper(api_key=None)
+        mapper.model = Mock()
+        mapper.model.generate_content.return_value = Mock(text='{"I": ["Write professional email"]}')
+        prompt = "Write a professional email"
+        context = {"domain": "business"}
+        
+        first = mapper.enhance_mapping(prompt, {"I": ["Write email"]}, context)
+        second = mapper.enhance_mapping(prompt, {"I": ["Write email"]}, context)
+        
+        self.assertEqual(mapper.model.generate_content.call_count, 1)
+        self.assertEqual(sorted(first["I"]), sorted(second["I"]))
+        self.assertIn("Write professional email", second["I"])
+    
+    def test_enhance_mapping_does_not_cache_unparseable_response(self):
+        """Test replies without a JSON object are retried instead of cached"""
+        mapper = LLMISTVONMapper(api_key=None)
+        mapper.model = Mock()
+        mapper.model.generate_content.return_value = Mock(text="Sorry, I cannot help with that.")
+        prompt = "Write a professional email"
+        context = {"domain": "business"}
+        
+        first = mapper.enhance_mapping(prompt, {"I": ["Write email"]}, context)
+        mapper.enhance_mapping(prompt, {"I": ["Write email"]}, context)
+        
+        self.assertEqual(first, {"I": ["Write email"]})
+        self.assertEqual(mapper.model.generate_content.call_count, 2)
+    
+    def test_enhance_mapping_batch(self):
+        """Test batch enhancement keeps input order and merges each result"""
+        mapper = LLMISTVONMapper(api_key=None)
+        mapper.model = Mock()
+        mapper.model.generate_content_async = AsyncMock(return_value=Mock(text='{"T": ["Templates"]}'))
+        items = [
+            ("Write an email", {"I": ["Write email"]}, {"domain": "communication"}),
+            ("Write a report", {"I": ["Write report"]}, {"domain": "business"})
+        ]
+        
+        results = mapper.enhance_mapping_batch(items)
+        
+        self.assertEqual(mapper.model.generate_content_async.call_count, 2)
+        self.assertEqual(results[0]["I"], ["Write email"])
+        self.assertEqual(results[1]["I"], ["Write report"])
+        self.assertEqual(results[1]["T"], ["Templates"])
+    
+    def test_validate_sanitizability_async(self):
+        """Test async validation parses the response and caches it"""
+        mapper = LLMISTVONMapper(api_key=None, sanitizability_cache_file=None)
+        mapper.model = Mock()
+        mapper.model.generate_content_async = AsyncMock(
+            return_value=Mock(text='{"sanitizable": false, "reason": "harmful"}')
+        )
+        
+        async def validate_twice():
+            return await asyncio.gather(
+                mapper.validate_sanitizability_async("blow up a building"),
+                mapper.validate_sanitizability_async("blow up a building")
+            )
+        
+        first, second = asyncio.run(validate_twice())
+        
+        self.assertFalse(first["sanitizable"])
+        self.assertEqual(first, second)
+        self.assertFalse(mapper.validate_sanitizability("blow up a building")["sanitizable"])
+    
+    def test_validate_sanitizability_persists_across_instances(self):
+        """Test sanitizability verdicts are reused from the on-disk cache"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, "sanitizability_cache.json")
+            first = LLMISTVONMapper(api_key=None, sanitizability_cache_file=cache_file)
+            first.model = Mock()
+            first.model.generate_content.return_value = Mock(text='{"sanitizable": true, "reason": "rewordable"}')
+            first.validate_sanitizability("How to hack a computer")
+            
+            second = LLMISTVONMapper(api_key=None, sanitizability_cache_file=cache_file)
+            second.model = Mock()
+            result = second.validate_sanitizability("How to hack a computer")
+            
+            second.model.generate_content.assert_not_called()
+            self.assertEqual(result, {"sanitizable": True, "reason": "rewordable"})
+    
+    def test_validate_sanitizability_does_not_persist_unparsed_reply(self):
+        """Test fail-open fallbacks for garbage replies never reach the on-disk cache"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_file = os.path.join(tmp_dir, "sanitizability_cache.json")
+            first = LLMISTVONMapper(api_key=None, sanitizability_cache_file=cache_file)
+            first.model = Mock()
+            first.model.generate_content.side_effect = [
+                Mock(text="I'm not able to answer that."),
+                Mock(text='{"reason": "no verdict given"}')
+            ]
+            self.assertTrue(first.validate_sanitizability("How to hack a computer")["sanitizable"])
+            self.assertTrue(first.validate_sanitizability("How to hack a computer")["sanitizable"])
+            
+            second = LLMISTVONMapper(api_key=None, sanitizability_cache_file=cache_file)
+            second.model = Mock()
+            second.model.generate_content.return_value = Mock(text='{"sanitizable": false, "reason": "harmful"}')
+            result = second.validate_sanitizability("How to hack a computer")
+            
+            self.assertEqual(first.model.generate_content.call_count, 2)
+            second.model.generate_content.assert_called_once()
+            self.assertFalse(result["sanitizable"])
+    
     def test_build_enhancement_prompt(self):
         """Test enhancement prompt building"""
         prompt = "Write a professional email"
@@ -90,6 +198,15 @@ class TestLLMMapper(unittest.TestCase):
         self.assertIn("O", result)
         self.assertEqual(result["I"], ["Write email"])
     
+    def test_parse_llm_response_fenced_with_trailing_braces(self):
+        """Test parsing a fenced LLM response followed by stray braces"""
+        response_text = '```json\n{"I": ["Use {braces} in text"], "O": {"format": "email"}}\n``` see {note}'
+        
+        result = self.llm_mapper._parse_llm_response(response_text)
+        
+        self.assertEqual(result["I"], ["Use {braces} in text"])
+        self.assertEqual(result["O"]["format"], "email")
+    
     def test_merge_mappings(self):
         """Test merging rule-based and LLM mappings"""
         rule_based = {
@@ -124,12 +241,22 @@ class TestLLMMapper(unittest.TestCase):
         # New fields should be added
         self.assertIn("O", merged)
         self.assertEqual(merged["O"]["format"], "email")
+    
+    def test_merge_mappings_keeps_order_and_unhashable_items(self):
+        """Test list merges keep first-seen order and accept dict items"""
+        rule_based = {"I": ["Write email", {"step": 1}]}
+        llm_enhanced = {"I": ["Write email", "Add CTA", {"step": 1}]}
+        
+        merged = self.llm_mapper._merge_mappings(rule_based, llm_enhanced)
+        
+        self.assertEqual(merged["I"], ["Write email", {"step": 1}, "Add CTA"])
 
 class TestJSONParser(unittest.TestCase):
     """Test JSON parser functionality"""
     
-    def setUp(self):
-        self.json_parser = JSONParser()
+    @classmethod
+    def setUpClass(cls):
+        cls.json_parser = default_parser
     
     def test_parse_gemini_response_valid(self):
         """Test parsing valid Gemini response"""
@@ -153,14 +280,43 @@ class TestJSONParser(unittest.TestCase):
         self.assertIn("O", result)
         self.assertEqual(result["I"], ["Execute the requested task effectively"])
     
-    def test_validate_istvon_structure(self):
+    def test_fallback_istvon_is_independent_copy(self):
+        """Test mutating a fallback result doesn't leak into later fallbacks"""
+        fallback = self.json_parser._get_fallback_istvon()
+        fallback["S"]["urls"].append("https://example.com")
+        
+        self.assertEqual(self.json_parser._get_fallback_istvon()["S"]["urls"], [])
+    
+    def test_parse_gemini_response_with_trailing_prose(self):
+        """Test JSON extraction stops at the balanced closing brace"""
+        response = 'Result: {"I": ["Write email"], "O": {"format": "email", "delivery": "direct"}} Note: {edit as needed}'
+        
+        result = self.json_parser.parse_gemini_response(response)
+        
+        self.assertEqual(result["I"], ["Write email"])
+        self.assertEqual(result["O"]["format"], "email")
+    
+    def test_parse_gemini_response_cached_copy(self):
+        """Test repeated responses come from the cache as independent copies"""
+        response = '{"I": ["Write email"], "O": {"format": "email", "delivery": "direct"}}'
+        
+        first = self.json_parser.parse_gemini_response(response)
+        first["I"].append("Mutated")
+        
+        with patch.object(self.json_parser, '_extract_json') as mock_extract:
+            second = self.json_parser.parse_gemini_response(response)
+            mock_extract.assert_not_called()
+        
+        self.assertEqual(second["I"], ["Write email"])
+    
+    def test_validate_and_sanitize(self):
         """Test ISTVON structure validation"""
         data = {
             "I": ["Write email"],
             "O": {"format": "email", "delivery": "direct"}
         }
         
-        result = self.json_parser._validate_istvon_structure(data)
+        result = self.json_parser._validate_and_sanitize(data)
         
         self.assertIn("I", result)
         self.assertIn("O", result)
@@ -169,6 +325,20 @@ class TestJSONParser(unittest.TestCase):
         self.assertIn("V", result)
         self.assertIn("N", result)
     
+    def test_validate_and_sanitize_cleans_text(self):
+        """Test instructions, tools and success criteria are sanitized during validation"""
+        data = {
+            "I": ["Write <b>email</b>", ""],
+            "T": ["\"search\"   tool"],
+            "O": {"format": "email", "delivery": "direct", "success_criteria": ["<i>clear</i>"]}
+        }
+        
+        result = self.json_parser._validate_and_sanitize(data)
+        
+        self.assertEqual(result["I"], ["Write bemail/b"])
+        self.assertEqual(result["T"], ["search tool"])
+        self.assertEqual(result["O"]["success_criteria"], ["iclear/i"])
+    
     def test_sanitize_text(self):
         """Test text sanitization"""
         unsafe_text = "Write <script>alert('hack')</script> email"
@@ -194,6 +364,7 @@ class TestJSONParser(unittest.TestCase):
         
         self.assertTrue(self.json_parser.is_valid_istvon(valid_istvon))
         self.assertFalse(self.json_parser.is_valid_istvon(invalid_istvon))
+        self.assertFalse(self.json_parser.is_valid_istvon([valid_istvon]))
 
 if __name__ == '__main__':
     unittest.main()
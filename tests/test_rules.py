@@ -1,4 +1,5 @@
 # tests/test_rules.py
+import asyncio
 import unittest
 import sys
 import os
@@ -9,12 +10,34 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from engine.pattern_matchers import ISTVONPatternMatcher
 from engine.context_analyzers import ContextAnalyzer
 from engine.completion_rules import ISTVONCompletionEngine
+from engine.rule_engine import ISTVONRuleEngine
+
+# "Write email" needs the LLM (low specificity); this prompt does not
+_COMPLETE_PROMPT = "Write a professional email about product launch for the marketing team in a formal tone as a PDF report"
+
+class TaggingLLMMapper:
+    """Stand-in for LLMISTVONMapper that marks each map it enhances"""
+    
+    def __init__(self):
+        self.batches = []
+    
+    def enhance_mapping(self, natural_prompt, preliminary_map, context_analysis):
+        return dict(preliminary_map, I=preliminary_map.get("I", []) + ["Enhanced: " + natural_prompt])
+    
+    async def enhance_mapping_async(self, natural_prompt, preliminary_map, context_analysis):
+        return self.enhance_mapping(natural_prompt, preliminary_map, context_analysis)
+    
+    def enhance_mapping_batch(self, items):
+        self.batches.append([natural_prompt for natural_prompt, _, _ in items])
+        return [self.enhance_mapping(*item) for item in items]
 
 class TestPatternMatchers(unittest.TestCase):
     """Test pattern matching functionality"""
     
-    def setUp(self):
-        self.pattern_matcher = ISTVONPatternMatcher()
+    @classmethod
+    def setUpClass(cls):
+        # Matchers, analyzers and engines hold no per-test state
+        cls.pattern_matcher = ISTVONPatternMatcher()
     
     def test_extract_instructions(self):
         """Test instruction extraction"""
@@ -48,12 +71,39 @@ class TestPatternMatchers(unittest.TestCase):
         
         self.assertIn("O", result)
         self.assertIsInstance(result["O"], dict)
+    
+    def test_extract_urls_keep_case(self):
+        """Test URLs are extracted with their original casing"""
+        prompt = "Summarize the article at https://Example.com/Docs/Page"
+        result = self.pattern_matcher.extract_istvon_elements(prompt)
+        
+        self.assertEqual(result["S"]["urls"], ["https://Example.com/Docs/Page"])
+    
+    def test_extract_tone_and_notification(self):
+        """Test presence-only tone and notification extraction"""
+        result = self.pattern_matcher.extract_istvon_elements("Write a casual tone update and notify me when done")
+        self.assertEqual(result["V"]["tone"], "professional")
+        self.assertTrue(result["N"]["completion_notice"])
+        
+        result = self.pattern_matcher.extract_istvon_elements("Write an update")
+        self.assertNotIn("tone", result["V"])
+        self.assertEqual(result["N"], {})
 
 class TestContextAnalyzer(unittest.TestCase):
     """Test context analysis functionality"""
     
-    def setUp(self):
-        self.context_analyzer = ContextAnalyzer()
+    @classmethod
+    def setUpClass(cls):
+        cls.context_analyzer = ContextAnalyzer()
+    
+    def test_domain_rules_are_independent_copies(self):
+        """Test mutating one analysis's domain rules leaves later analyses intact"""
+        first = self.context_analyzer.analyze_prompt_context("Write a business report")
+        first["domain_specific_rules"]["default_tools"].append("Mutated")
+        
+        second = self.context_analyzer.analyze_prompt_context("Write a business report")
+        
+        self.assertNotIn("Mutated", second["domain_specific_rules"]["default_tools"])
     
     def test_identify_domain(self):
         """Test domain identification"""
@@ -94,8 +144,9 @@ class TestContextAnalyzer(unittest.TestCase):
 class TestCompletionRules(unittest.TestCase):
     """Test completion rules functionality"""
     
-    def setUp(self):
-        self.completion_engine = ISTVONCompletionEngine()
+    @classmethod
+    def setUpClass(cls):
+        cls.completion_engine = ISTVONCompletionEngine()
     
     def test_apply_completion_rules(self):
         """Test completion rules application"""
@@ -124,6 +175,17 @@ class TestCompletionRules(unittest.TestCase):
         self.assertIn("delivery", result["O"])
         self.assertIn("success_criteria", result["O"])
     
+    def test_default_outcome_is_copied(self):
+        """Test default outcome is a fresh copy on each call"""
+        context = {"domain": "general", "complexity": "medium"}
+        
+        first = self.completion_engine.apply_completion_rules({}, context)
+        first["O"]["success_criteria"].append("Mutated")
+        second = self.completion_engine.apply_completion_rules({}, context)
+        
+        self.assertNotIn("Mutated", second["O"]["success_criteria"])
+        self.assertEqual(second["O"]["format"], "Text response")
+    
     def test_enhance_instructions(self):
         """Test instruction enhancement"""
         instructions = ["Write a report"]
@@ -146,5 +208,75 @@ class TestCompletionRules(unittest.TestCase):
         self.assertEqual(variables["tone"], "engaging")
         self.assertEqual(variables["format"], "Creative content")
 
+class TestRuleEngine(unittest.TestCase):
+    """Test the mapping pipeline with a stand-in LLM mapper"""
+    
+    def setUp(self):
+        self.llm_mapper = TaggingLLMMapper()
+        self.rule_engine = ISTVONRuleEngine(llm_mapper=self.llm_mapper)
+    
+    def test_map_to_istvon_batch_keeps_order(self):
+        """Test mixed LLM and rule-only prompts come back in input order"""
+        prompts = ["Write email", _COMPLETE_PROMPT, "Help", _COMPLETE_PROMPT]
+        
+        results = self.rule_engine.map_to_istvon_batch(prompts)
+        
+        self.assertEqual(self.llm_mapper.batches, [["Write email", "Help"]])
+        self.assertEqual([result["used_llm"] for result in results], [True, False, True, False])
+        self.assertIn("Enhanced: Write email", results[0]["istvon_json"]["I"])
+        self.assertIn("Enhanced: Help", results[2]["istvon_json"]["I"])
+        for result in results[1::2]:
+            self.assertFalse(any(i.startswith("Enhanced:") for i in result["istvon_json"]["I"]))
+        self.assertEqual(results[1]["istvon_json"], results[3]["istvon_json"])
+    
+    def test_map_to_istvon_batch_survives_llm_batch_failure(self):
+        """Test a failed LLM round falls back to the rule-based maps"""
+        def fail(items):
+            raise RuntimeError("asyncio.run() cannot be called from a running event loop")
+        self.llm_mapper.enhance_mapping_batch = fail
+        
+        results = self.rule_engine.map_to_istvon_batch(["Write email", _COMPLETE_PROMPT])
+        
+        self.assertTrue(all(result["success"] for result in results))
+        self.assertTrue(results[0]["used_llm"])
+        self.assertNotIn("Enhanced: Write email", results[0]["istvon_json"]["I"])
+    
+    def test_map_to_istvon_async_matches_sync(self):
+        """Test the async pipeline produces the same ISTVON JSON as the sync one"""
+        for prompt in ["Write email", _COMPLETE_PROMPT]:
+            sync_result = self.rule_engine.map_to_istvon(prompt)
+            async_result = asyncio.run(self.rule_engine.map_to_istvon_async(prompt))
+            
+            self.assertTrue(async_result["success"])
+            self.assertEqual(async_result["istvon_json"], sync_result["istvon_json"])
+            self.assertEqual(async_result["used_llm"], sync_result["used_llm"])
+    
+    def test_needs_llm_assistance_reasons(self):
+        """Test each gate branch reports its own reason"""
+        complete_map = {"I": ["Write email"], "O": {"format": "email"}, "V": {"tone": "formal"}}
+        context = {"complexity": "medium", "specificity": "medium"}
+        cases = [
+            (complete_map, dict(context, complexity="complex"), (True, "complex prompt")),
+            (complete_map, dict(context, specificity="low"), (True, "low specificity")),
+            (dict(complete_map, I=[]), context, (True, "no instructions extracted")),
+            (dict(complete_map, O={}), context, (True, "missing outcome")),
+            (dict(complete_map, V={}), context, (True, "missing variables")),
+            (complete_map, context, (False, None))
+        ]
+        
+        for preliminary_map, context_analysis, expected in cases:
+            self.assertEqual(self.rule_engine._needs_llm_assistance(preliminary_map, context_analysis), expected)
+        
+        rule_only = ISTVONRuleEngine(use_llm=False)
+        self.assertEqual(rule_only._llm_gate(complete_map, dict(context, complexity="complex")), (False, None))
+    
+    def test_llm_reason_in_result(self):
+        """Test map_to_istvon reports why the LLM was or was not used"""
+        self.assertEqual(self.rule_engine.map_to_istvon("Write email")["llm_reason"], "low specificity")
+        
+        result = self.rule_engine.map_to_istvon(_COMPLETE_PROMPT)
+        self.assertFalse(result["used_llm"])
+        self.assertIsNone(result["llm_reason"])
+
 if __name__ == '__main__':
     unittest.main()
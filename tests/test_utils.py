@@ -0,0 +1,185 @@
+# tests/test_utils.py
+import unittest
+import sys
+import os
+import tempfile
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_cache import JSONFileCache
+from utils.logger import Logger, _DataFormatter, _SHARED_HANDLER
+from utils import validators
+from utils.helpers import HelperFunctions
+from utils.validators import ISTVONValidator
+
+class TestValidators(unittest.TestCase):
+    """Test ISTVON validation utilities"""
+    
+    def test_validate_json_syntax(self):
+        """Test JSON syntax validation, including the fast-reject path"""
+        self.assertTrue(ISTVONValidator.validate_json_syntax(' {"I": ["Write email"]} '))
+        self.assertTrue(ISTVONValidator.validate_json_syntax('-1.5'))
+        self.assertFalse(ISTVONValidator.validate_json_syntax('{"I": [}'))
+        self.assertFalse(ISTVONValidator.validate_json_syntax('Here is the JSON: {}'))
+        self.assertFalse(ISTVONValidator.validate_json_syntax('   '))
+    
+    def test_validate_prompt_length(self):
+        """Test prompts must be non-blank and within the length limit"""
+        self.assertTrue(ISTVONValidator.validate_prompt_length("  Write an email  "))
+        self.assertFalse(ISTVONValidator.validate_prompt_length(""))
+        self.assertFalse(ISTVONValidator.validate_prompt_length(" \t\n " * 100, max_length=1000))
+        self.assertFalse(ISTVONValidator.validate_prompt_length("x" * 11, max_length=10))
+    
+    def test_class_methods_alias_module_functions(self):
+        """Test the class API and the module-level validators are the same functions"""
+        self.assertIs(ISTVONValidator.validate_prompt_length, validators.validate_prompt_length)
+        self.assertIs(ISTVONValidator.sanitize_input, validators.sanitize_input)
+    
+    def test_sanitize_input(self):
+        """Test harmful characters are stripped and the result trimmed"""
+        sanitized = ISTVONValidator.sanitize_input('  <b>Tom & "Jerry"</b> \'s show  ')
+        
+        self.assertEqual(sanitized, "bTom  Jerry/b s show")
+
+class TestLogger(unittest.TestCase):
+    """Test ISTVON logging helpers"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.logger = Logger("TestISTVON")
+    
+    def test_log_istvon_processing_summary(self):
+        """Test processing summaries are rendered from lazy %-style args"""
+        result = {"success": True, "context": {"domain": "business"}}
+        
+        with self.assertLogs("TestISTVON", level="INFO") as captured:
+            self.logger.log_istvon_processing("Write an email", result, 12.5)
+        
+        self.assertEqual(captured.records[0].args, (14, 12.5, True, "business"))
+        self.assertIn("domain=business", captured.output[0])
+    
+    def test_sanitize_user_data_keeps_whitelisted_keys(self):
+        """Test only whitelisted user data keys survive sanitization"""
+        user_data = {"email": "a@b.com", "domain": "business", "prompt_length": 42, "prompt": "secret"}
+        
+        sanitized = self.logger._sanitize_user_data(user_data)
+        
+        self.assertEqual(sanitized, {"prompt_length": 42, "domain": "business"})
+    
+    def test_format_data_keeps_value_types(self):
+        """Test payloads render as JSON with their value types intact"""
+        boolean = self.logger._format_data({"endpoint": "/enhance", "success": True})
+        numeric = self.logger._format_data({"endpoint": "/enhance", "success": 1})
+        
+        self.assertIn('"success": true', boolean)
+        self.assertIn('"success": 1', numeric)
+    
+    def test_data_rendered_at_format_time(self):
+        """Test data travels on the record and is only rendered by the formatter"""
+        with self.assertLogs("TestISTVON", level="INFO") as captured:
+            self.logger.info("Export Complete", {"records": 3})
+        
+        record = captured.records[0]
+        self.assertEqual(record.getMessage(), "Export Complete")
+        self.assertEqual(record.istvon_data, {"records": 3})
+        self.assertIn('Export Complete | Data: {', _DataFormatter().format(record))
+    
+    def test_performance_metrics_logged_in_batches(self):
+        """Test metrics are buffered and emitted as one record per batch"""
+        logger = Logger("TestISTVONMetrics")
+        
+        with self.assertLogs("TestISTVONMetrics", level="INFO") as captured:
+            metrics = {"latency_ms": 1}
+            logger.log_performance_metrics(metrics)
+            metrics["latency_ms"] = 99
+            logger.log_performance_metrics({"latency_ms": 2})
+            self.assertEqual(logger._metrics_buf, [{"latency_ms": 1}, {"latency_ms": 2}])
+            logger.flush_metrics()
+        
+        self.assertEqual(len(captured.records), 1)
+        self.assertEqual(captured.records[0].istvon_data, [{"latency_ms": 1}, {"latency_ms": 2}])
+    
+    def test_queued_records_are_snapshotted_by_caller(self):
+        """Test the shared queue handler renders the message and copies data before enqueueing"""
+        data = {"records": 3}
+        record = self.logger.logger.makeRecord(
+            "TestISTVON", 20, __file__, 0, "prompt_length=%s", (14,), None,
+            extra={"istvon_data": data}
+        )
+        
+        prepared = _SHARED_HANDLER.prepare(record)
+        data["records"] = 4
+        
+        self.assertEqual(prepared.msg, "prompt_length=14")
+        self.assertIsNone(prepared.args)
+        self.assertEqual(prepared.istvon_data, {"records": 3})
+        self.assertIn('"records": 3', _DataFormatter().format(prepared))
+
+class TestHelperFunctions(unittest.TestCase):
+    """Test general helper functions"""
+    
+    def test_get_file_size_info(self):
+        """Test size info for plain data and data JSON encoders reject"""
+        self.assertEqual(HelperFunctions.get_file_size_info({"I": ["Write email"]}), "0.0 KB")
+        self.assertEqual(HelperFunctions.get_file_size_info({"text": "x" * 2048}), "2.0 KB")
+        self.assertEqual(HelperFunctions.get_file_size_info({1: "a"}), "0.0 KB")
+        self.assertEqual(HelperFunctions.get_file_size_info({"n": 2 ** 70}), "0.0 KB")
+        self.assertEqual(HelperFunctions.get_file_size_info({(1, 2): "a"}), "0.0 KB")
+
+class TestJSONFileCache(unittest.TestCase):
+    """Test the persistent JSON lines cache"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.tmp_dir.name, "cache.json")
+    
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+    
+    def test_get_returns_independent_copy(self):
+        """Test mutating a returned value does not change the cache"""
+        cache = JSONFileCache(self.cache_file)
+        cache.set("k", {"reason": "ok"})
+        cache.get("k")["reason"] = "mutated"
+        self.assertEqual(cache.get("k"), {"reason": "ok"})
+    
+    def test_expired_entries_dropped_on_load(self):
+        """Test expired entries are not kept after reading the file"""
+        JSONFileCache(self.cache_file, ttl=-1).set("old", 1)
+        JSONFileCache(self.cache_file).set("new", 2)
+        
+        cache = JSONFileCache(self.cache_file)
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.get("new"), 2)
+        self.assertNotIn("old", cache._load())
+    
+    def test_file_compacted_when_overwritten(self):
+        """Test repeated writes to the same keys do not grow the file forever"""
+        cache = JSONFileCache(self.cache_file)
+        for i in range(500):
+            cache.set("k%d" % (i % 3), i)
+        
+        with open(self.cache_file) as f:
+            lines = sum(1 for _ in f)
+        self.assertLess(lines, 100)
+        reloaded = JSONFileCache(self.cache_file)
+        self.assertEqual(reloaded.get("k2"), 497)
+        self.assertEqual(reloaded.get("k1"), 499)
+    
+    def test_compaction_keeps_other_writers_entries(self):
+        """Test compacting one instance does not drop entries another appended"""
+        first = JSONFileCache(self.cache_file)
+        other = JSONFileCache(self.cache_file)
+        first.set("k0", 0)
+        other.set("other", "kept")
+        for i in range(200):
+            first.set("k0", i)
+        
+        reloaded = JSONFileCache(self.cache_file)
+        self.assertEqual(reloaded.get("other"), "kept")
+        self.assertEqual(reloaded.get("k0"), 199)
+        self.assertEqual(first.get("other"), "kept")
+
+if __name__ == '__main__':
+    unittest.main()
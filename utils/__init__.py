@@ -6,7 +6,7 @@ Utility modules for helper functions, JSON parsing, and logging.
 """
 
 from .helpers import HelperFunctions, ExamplePrompts
-from .json_parser import JSONParser
+from .json_parser import JSONParser, default_parser
 from .logger import Logger, app_logger, broker_logger, llm_logger, db_logger
 from .validators import ISTVONValidator
 
@@ -14,6 +14,7 @@ __all__ = [
     'HelperFunctions',
     'ExamplePrompts',
     'JSONParser',
+    'default_parser',
     'Logger',
     'app_logger',
     'broker_logger', 
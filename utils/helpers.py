@@ -1,7 +1,18 @@
 # utils/helpers.py
+import json
 import time
 from datetime import datetime
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping
+
+try:
+    import orjson
+    
+    def _json_size(data: Any) -> int:
+        return len(orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS))
+except ImportError:
+    def _json_size(data: Any) -> int:
+        return len(json.dumps(data, default=str, separators=(',', ':')).encode('utf-8'))
 
 class HelperFunctions:
     """General helper functions"""
@@ -23,11 +34,28 @@ class HelperFunctions:
             return text
         return text[:max_length-3] + "..."
     
+    @staticmethod
+    def dedup_ordered(items: Iterable[Any]) -> List[Any]:
+        """Remove duplicates keeping first-seen order (dict/list items compared by JSON)"""
+        unique = {}
+        for item in items:
+            try:
+                hash(item)
+                key = (0, item)
+            except TypeError:
+                key = (1, json.dumps(item, sort_keys=True, default=str))
+            unique.setdefault(key, item)
+        return list(unique.values())
+    
     @staticmethod
     def get_file_size_info(data: Dict) -> str:
-        """Get approximate size information for data"""
-        json_str = str(data)
-        size_kb = len(json_str.encode('utf-8')) / 1024
+        """Get approximate size information for data (compact JSON bytes)"""
+        try:
+            size = _json_size(data)
+        except (TypeError, ValueError):
+            # e.g. integers beyond 64 bits for orjson, or keys JSON can't encode
+            size = len(str(data).encode('utf-8'))
+        size_kb = size / 1024
         return f"{size_kb:.1f} KB"
 
 # Example usage helper
@@ -41,12 +69,15 @@ class ExamplePrompts:
         "research_summary": "Summarize the key findings from recent climate change research papers. Focus on actionable insights for policymakers, keep it concise but comprehensive."
     }
     
+    # Read-only view handed to callers so the class constant can't be mutated
+    _EXAMPLES_VIEW = MappingProxyType(EXAMPLES)
+    
     @classmethod
     def get_example(cls, key: str) -> str:
         """Get a specific example prompt"""
         return cls.EXAMPLES.get(key, "")
     
     @classmethod
-    def get_all_examples(cls) -> Dict[str, str]:
-        """Get all example prompts"""
-        return cls.EXAMPLES
\ No newline at end of file
+    def get_all_examples(cls) -> Mapping[str, str]:
+        """Get all example prompts as a read-only mapping"""
+        return cls._EXAMPLES_VIEW
\ No newline at end of file
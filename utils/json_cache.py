@@ -0,0 +1,89 @@
+# utils/json_cache.py
+import copy
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Lines beyond twice the live entry count, plus this slack, trigger a rewrite
+_COMPACT_SLACK = 64
+
+class JSONFileCache:
+    """Persistent key/value cache stored as JSON lines with per-entry expiry.
+    
+    Safe to share between threads. Separate instances or processes may share
+    one file: compaction re-reads it first, so their appended entries survive,
+    though an append racing the rewrite itself can be lost. That only costs a
+    recomputation, since the cache is advisory.
+    """
+    
+    def __init__(self, cache_file: str, ttl: int = 86400):
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._entries = None
+        self._lines = 0
+        self._lock = threading.Lock()
+    
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Read the cache file once; later lines override earlier ones"""
+        if self._entries is None:
+            self._entries = {}
+            self._lines = 0
+            try:
+                with open(self.cache_file, 'r') as f:
+                    for line in f:
+                        if line.strip():
+                            self._lines += 1
+                            try:
+                                entry = json.loads(line)
+                                self._entries[entry["key"]] = entry
+                            except (json.JSONDecodeError, KeyError, TypeError):
+                                continue  # Skip corrupt lines
+            except FileNotFoundError:
+                pass
+            self._drop_expired()
+        return self._entries
+    
+    def _drop_expired(self) -> None:
+        """Forget entries whose expiry has passed"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry.get("expires", 0) < now]
+        for key in expired:
+            del self._entries[key]
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get a copy of a cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._load().get(key)
+        if entry is None or entry.get("expires", 0) < time.time():
+            return None
+        return copy.deepcopy(entry.get("value"))
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store a value and append it to the cache file"""
+        entry = {"key": key, "value": copy.deepcopy(value), "expires": time.time() + self.ttl}
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            
+            with open(self.cache_file, 'a') as f:
+                json.dump(entry, f)
+                f.write('\n')
+            self._lines += 1
+            
+            if self._lines >= 2 * len(entries) + _COMPACT_SLACK:
+                self._compact()
+    
+    def _compact(self) -> None:
+        """Rewrite the cache file with only the live entries; caller holds the lock"""
+        # Re-read so entries other writers appended since our load are kept
+        self._entries = None
+        self._load()
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            for entry in self._entries.values():
+                json.dump(entry, f)
+                f.write('\n')
+        os.replace(tmp_file, self.cache_file)
+        self._lines = len(self._entries)
@@ -1,8 +1,201 @@
 # utils/json_logger.py
+import atexit
 import json
+import mmap
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_line(entry: Any) -> bytes:
+        return orjson.dumps(entry) + b'\n'
+except ImportError:
+    _json_loads = json.loads
+    
+    def _json_line(entry: Any) -> bytes:
+        return (json.dumps(entry) + '\n').encode('utf-8')
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as YYYY-MM-DDTHH:MM:SS.ffffffZ, without building a datetime"""
+    secs, nanos = divmod(time.time_ns(), 1_000_000_000)
+    tm = time.gmtime(secs)
+    return (f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
+            f"T{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}.{nanos // 1000:06d}Z")
+
+
+# Buffered appends are flushed after this many entries or seconds, whichever comes first
+_FLUSH_EVERY = 64
+_FLUSH_INTERVAL = 1.0
+
+# Block size used when reading the log backwards from its end
+_TAIL_CHUNK = 1 << 16
+
+# Sidecar holding [verdict, offset] pairs for each log line
+_INDEX_SUFFIX = ".idx"
+
+
+class _LogWriter:
+    """Long-lived append handle for one log file, flushed in batches.
+    
+    A batch is flushed once it holds _FLUSH_EVERY entries, or by a timer
+    _FLUSH_INTERVAL seconds after its first entry, so a burst followed by
+    silence still reaches the OS within that interval. Also keeps a verdict -> line-offset index, persisted as a JSON-lines
+    sidecar next to the log so verdict lookups don't rescan the file.
+    """
+    
+    def __init__(self, path: str):
+        self._index_path = path + _INDEX_SUFFIX
+        self._offsets: Dict[str, List[int]] = {}
+        self._pending_index: List[bytes] = []
+        self._load_index(path)
+        
+        self._fh = open(path, 'ab', buffering=1 << 16)
+        self._index_fh = open(self._index_path, 'ab')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer: Optional[threading.Timer] = None
+    
+    def write(self, data: bytes, verdict: str) -> None:
+        with self._lock:
+            offset = self._fh.tell()
+            self._fh.write(data)
+            self._offsets.setdefault(verdict, []).append(offset)
+            self._pending_index.append(_json_line([verdict, offset]))
+            self._pending += 1
+            if self._pending >= _FLUSH_EVERY:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(_FLUSH_INTERVAL, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def offsets(self, verdict: str) -> List[int]:
+        """Byte offsets of every logged line with this verdict, oldest first"""
+        with self._lock:
+            return list(self._offsets.get(verdict, ()))
+    
+    def flush(self) -> None:
+        with self._lock:
+            if self._pending:
+                self._flush_locked()
+    
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._pending and not self._fh.closed:
+                self._flush_locked()
+    
+    @property
+    def closed(self) -> bool:
+        return self._fh.closed
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._fh.closed:
+                self._flush_locked()
+                self._fh.close()
+                self._index_fh.close()
+    
+    def _flush_locked(self) -> None:
+        self._fh.flush()
+        # Index entries go out after the log lines they point at
+        if self._pending_index:
+            self._index_fh.write(b''.join(self._pending_index))
+            self._index_fh.flush()
+            self._pending_index.clear()
+        self._pending = 0
+    
+    def _load_index(self, path: str) -> None:
+        """Load the sidecar index, then index any log lines it doesn't cover yet"""
+        try:
+            with open(self._index_path, 'rb') as f:
+                entries = [_json_loads(line) for line in f if line.strip()]
+        except (ValueError, FileNotFoundError):
+            entries = []
+        
+        try:
+            with open(path, 'rb') as log:
+                resume = 0
+                if entries:
+                    resume = self._line_end(log, entries[-1][1])
+                    if resume is None:
+                        # Log was truncated or replaced; the sidecar no longer matches it
+                        entries = []
+                        resume = 0
+                missing = self._scan_verdicts(log, resume)
+        except FileNotFoundError:
+            entries, missing = [], []
+        
+        for verdict, offset in entries:
+            self._offsets.setdefault(verdict, []).append(offset)
+        for verdict, offset in missing:
+            self._offsets.setdefault(verdict, []).append(offset)
+        
+        if not entries:
+            # Start the sidecar afresh so stale entries never mix with new ones
+            with open(self._index_path, 'wb') as f:
+                f.write(b''.join(_json_line(entry) for entry in missing))
+        elif missing:
+            with open(self._index_path, 'ab') as f:
+                f.write(b''.join(_json_line(entry) for entry in missing))
+    
+    @staticmethod
+    def _line_end(log, offset: int) -> Optional[int]:
+        """Offset just past the line starting at `offset`, or None if no line starts there"""
+        if offset > 0:
+            log.seek(offset - 1)
+            if log.read(1) != b'\n':
+                return None
+        log.seek(offset)
+        line = log.readline()
+        if not line.endswith(b'\n'):
+            return None
+        return log.tell()
+    
+    @staticmethod
+    def _scan_verdicts(log, start: int) -> List[list]:
+        """[verdict, offset] for every log line from `start` to the end of the file"""
+        found = []
+        log.seek(start)
+        offset = start
+        for line in log:
+            if line.strip():
+                try:
+                    found.append([_json_loads(line).get('verdict'), offset])
+                except ValueError:
+                    pass
+            offset += len(line)
+        return found
+
+
+# One writer per file, shared by every RuleEngineLogger pointing at it
+_WRITERS: Dict[str, _LogWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def _get_writer(path: str) -> _LogWriter:
+    key = os.path.abspath(path)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None or writer.closed:
+            writer = _WRITERS[key] = _LogWriter(key)
+        return writer
+
+
+@atexit.register
+def _close_writers() -> None:
+    with _WRITERS_LOCK:
+        for writer in _WRITERS.values():
+            writer.close()
+
 
 class RuleEngineLogger:
     """JSON file logger for local rule engine decisions"""
@@ -10,6 +203,7 @@ class RuleEngineLogger:
     def __init__(self, log_file: str = "rule_engine_logs.json"):
         self.log_file = log_file
         self.ensure_log_file_exists()
+        self._writer = _get_writer(log_file)
     
     def ensure_log_file_exists(self):
         """Ensure the log file exists with proper structure"""
@@ -21,7 +215,7 @@ class RuleEngineLogger:
         """Log a rule engine decision to JSON file in the specified format"""
         
         # Format timestamp as ISO with Z suffix
-        timestamp = datetime.now().strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        timestamp = _utc_timestamp()
         
         log_entry = {
             "ts": timestamp,
@@ -30,33 +224,65 @@ class RuleEngineLogger:
             "reason": reason
         }
         
-        # Append as a single JSON line
-        with open(self.log_file, 'a') as f:
-            json.dump(log_entry, f)
-            f.write('\n')
+        # Append as a single JSON line; the shared writer batches the flushes
+        self._writer.write(_json_line(log_entry), verdict)
+    
+    def flush(self) -> None:
+        """Write any buffered log entries to disk"""
+        self._writer.flush()
+    
+    def close(self) -> None:
+        """Flush and close the writer for this log file; a new logger reopens it"""
+        self._writer.close()
     
     def get_recent_logs(self, limit: int = 10) -> list:
         """Get recent log entries"""
-        logs = []
+        if limit <= 0:
+            return []
+        self.flush()
         try:
-            with open(self.log_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        logs.append(json.loads(line.strip()))
-            return logs[-limit:] if logs else []
+            with open(self.log_file, 'rb') as f:
+                lines = self._read_tail_lines(f, limit)
+            return [_json_loads(line) for line in lines]
         except (json.JSONDecodeError, FileNotFoundError):
             return []
     
+    @staticmethod
+    def _read_tail_lines(f, limit: int) -> list:
+        """Read backwards from the end of f until the last `limit` non-empty lines are in hand"""
+        pos = f.seek(0, os.SEEK_END)
+        tail = b''
+        lines = []
+        while pos > 0:
+            step = min(_TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            # Count non-empty lines, so blank ones don't end the scan early;
+            # one extra guarantees the earliest kept line is complete
+            lines = [line for line in tail.split(b'\n') if line.strip()]
+            if len(lines) > limit:
+                break
+        
+        if pos > 0:
+            lines = lines[1:]  # possibly cut mid-line
+        return lines[-limit:]
+    
     def get_logs_by_verdict(self, verdict: str) -> list:
         """Get logs filtered by verdict"""
-        logs = []
+        self.flush()
+        offsets = self._writer.offsets(verdict)
+        if not offsets:
+            return []
         try:
-            with open(self.log_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        log_entry = json.loads(line.strip())
-                        if log_entry.get('verdict') == verdict:
-                            logs.append(log_entry)
-            return logs
-        except (json.JSONDecodeError, FileNotFoundError):
+            with open(self.log_file, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Decode only the indexed lines, sliced straight out of the mapping
+                logs = []
+                for offset in offsets:
+                    end = mm.find(b'\n', offset)
+                    logs.append(_json_loads(mm[offset:end if end >= 0 else len(mm)]))
+                return logs
+        except (ValueError, FileNotFoundError):
+            # ValueError covers JSONDecodeError and mapping an empty file
             return []
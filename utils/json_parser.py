@@ -1,27 +1,118 @@
 # utils/json_parser.py
+import copy
+import hashlib
 import json
 import re
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from .logger import Logger
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Parsed responses kept for repeated/retried Gemini output
+_PARSE_CACHE_SIZE = 1024
+
+# Template returned when a response can't be parsed; hand out copies only
+_FALLBACK_ISTVON = {
+    "I": ["Execute the requested task effectively"],
+    "S": {"documents": [], "urls": [], "data_points": {}},
+    "T": [],
+    "V": {"tone": "professional", "complexity": "medium"},
+    "O": {
+        "format": "Text response",
+        "delivery": "Inline display",
+        "success_criteria": ["Meets user requirements"]
+    },
+    "N": {"completion_notice": True}
+}
+
+# Variable keys kept from a parsed "V" block, and the value types accepted for them
+_VALID_VAR_KEYS = frozenset(("tone", "length", "complexity", "format", "audience", "style"))
+_SCALAR_TYPES = (str, int, float)
+
+# Characters stripped from sanitized text
+_STRIP_TABLE = str.maketrans('', '', '<>"\'')
+
+# Characters that matter when walking a JSON value: its brackets, quotes and escapes
+_JSON_TOKEN_RES = {
+    "{": re.compile(r'[{}"\\]'),
+    "[": re.compile(r'[\[\]"\\]')
+}
+
+
+def extract_json_slice(text: str, open_char: str = "{") -> Optional[str]:
+    """Return the first balanced JSON object (or array, with open_char="[") in text.
+
+    A single linear pass over bracket, quote and escape tokens; prose or code
+    fences around the JSON are skipped. Returns None if nothing balanced is found.
+    """
+    start = text.find(open_char)
+    if start < 0:
+        return None
+    
+    close_char = "}" if open_char == "{" else "]"
+    depth = 0
+    in_string = False
+    skip = -1
+    for m in _JSON_TOKEN_RES[open_char].finditer(text, start):
+        pos = m.start()
+        if pos == skip:
+            continue  # escaped character inside a string
+        ch = m.group()
+        if in_string:
+            if ch == "\\":
+                skip = pos + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == open_char:
+            depth += 1
+        elif ch == close_char:
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
+
+
 class JSONParser:
     """Safe JSON parser for Gemini output with validation and sanitization"""
     
     def __init__(self):
         self.logger = Logger("JSONParser")
-        
-        # ISTVON schema validation patterns
-        self.istvon_patterns = {
-            "I": r'"(?:I|Instructions?)"\s*:\s*\[(?:[^\[\]]*|"[^"]*")*\]',
-            "S": r'"(?:S|Sources?)"\s*:\s*\{[^}]*\}',
-            "T": r'"(?:T|Tools?)"\s*:\s*\[(?:[^\[\]]*|"[^"]*")*\]',
-            "V": r'"(?:V|Variables?)"\s*:\s*\{[^}]*\}',
-            "O": r'"(?:O|Outcome?)"\s*:\s*\{[^}]*\}',
-            "N": r'"(?:N|Notifications?)"\s*:\s*\{[^}]*\}'
-        }
+        self._parse_cache = OrderedDict()
+        # default_parser is shared across threads; guards every cache access
+        self._parse_cache_lock = threading.Lock()
     
     def parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
         """Parse and validate Gemini response for ISTVON JSON"""
+        if not isinstance(response_text, str):
+            return self._parse_response(response_text)
+        
+        key = hashlib.blake2b(response_text.encode("utf-8"), digest_size=16).digest()
+        with self._parse_cache_lock:
+            cached = self._parse_cache.get(key)
+            if cached is not None:
+                self._parse_cache.move_to_end(key)
+        
+        if cached is None:
+            # Parse outside the lock; concurrent misses for one key just store equal results
+            cached = self._parse_response(response_text)
+            with self._parse_cache_lock:
+                self._parse_cache[key] = cached
+                while len(self._parse_cache) > _PARSE_CACHE_SIZE:
+                    self._parse_cache.popitem(last=False)
+        
+        # Hand out a copy so callers can't mutate the cached entry
+        return copy.deepcopy(cached)
+    
+    def _parse_response(self, response_text: str) -> Dict[str, Any]:
+        """Extract, parse, validate and sanitize a single response"""
         try:
             # Step 1: Extract JSON from response
             json_str = self._extract_json(response_text)
@@ -37,11 +128,8 @@ class JSONParser:
                 self.logger.warning("Failed to parse JSON")
                 return self._get_fallback_istvon()
             
-            # Step 3: Validate ISTVON structure
-            validated_data = self._validate_istvon_structure(parsed_data)
-            
-            # Step 4: Sanitize content
-            sanitized_data = self._sanitize_istvon_content(validated_data)
+            # Step 3: Validate ISTVON structure and sanitize its text in one pass
+            sanitized_data = self._validate_and_sanitize(parsed_data)
             
             self.logger.info("Successfully parsed and validated ISTVON JSON")
             return sanitized_data
@@ -52,17 +140,8 @@ class JSONParser:
     
     def _extract_json(self, text: str) -> Optional[str]:
         """Extract JSON from response text"""
-        # Try to find JSON object
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            return json_match.group()
-        
-        # Try to find JSON array
-        array_match = re.search(r'\[.*\]', text, re.DOTALL)
-        if array_match:
-            return array_match.group()
-        
-        return None
+        # Try to find JSON object, then JSON array
+        return extract_json_slice(text) or extract_json_slice(text, "[")
     
     def _safe_json_parse(self, json_str: str) -> Optional[Dict[str, Any]]:
         """Safely parse JSON string"""
@@ -72,7 +151,7 @@ class JSONParser:
                 return None
             
             # Try to parse
-            parsed = json.loads(json_str)
+            parsed = _json_loads(json_str)
             
             # Ensure it's a dictionary
             if not isinstance(parsed, dict):
@@ -87,13 +166,14 @@ class JSONParser:
             self.logger.warning(f"Unexpected error parsing JSON: {e}")
             return None
     
-    def _validate_istvon_structure(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate and fix ISTVON structure"""
+    def _validate_and_sanitize(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and fix ISTVON structure, sanitizing free text as it goes"""
         validated = {}
+        sanitize = self._sanitize_text
         
         # Validate Instructions (I)
         if "I" in data and isinstance(data["I"], list):
-            validated["I"] = [str(item) for item in data["I"] if item]
+            validated["I"] = list(map(sanitize, map(str, filter(None, data["I"]))))
         else:
             validated["I"] = ["Execute the requested task effectively"]
         
@@ -105,7 +185,7 @@ class JSONParser:
         
         # Validate Tools (T)
         if "T" in data and isinstance(data["T"], list):
-            validated["T"] = [str(item) for item in data["T"] if item]
+            validated["T"] = list(map(sanitize, map(str, filter(None, data["T"]))))
         else:
             validated["T"] = []
         
@@ -138,10 +218,10 @@ class JSONParser:
         validated_sources = {"documents": [], "urls": [], "data_points": {}}
         
         if "documents" in sources and isinstance(sources["documents"], list):
-            validated_sources["documents"] = [str(doc) for doc in sources["documents"]]
+            validated_sources["documents"] = list(map(str, sources["documents"]))
         
         if "urls" in sources and isinstance(sources["urls"], list):
-            validated_sources["urls"] = [str(url) for url in sources["urls"]]
+            validated_sources["urls"] = list(map(str, sources["urls"]))
         
         if "data_points" in sources and isinstance(sources["data_points"], dict):
             validated_sources["data_points"] = sources["data_points"]
@@ -152,10 +232,8 @@ class JSONParser:
         """Validate variables structure"""
         validated_vars = {}
         
-        valid_keys = ["tone", "length", "complexity", "format", "audience", "style"]
-        
         for key, value in variables.items():
-            if key in valid_keys and isinstance(value, (str, int, float)):
+            if key in _VALID_VAR_KEYS and isinstance(value, _SCALAR_TYPES):
                 validated_vars[key] = str(value)
         
         # Ensure required variables
@@ -165,7 +243,7 @@ class JSONParser:
         return validated_vars
     
     def _validate_outcome(self, outcome: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate outcome structure"""
+        """Validate outcome structure, sanitizing its success criteria"""
         validated_outcome = {}
         
         if "format" in outcome and isinstance(outcome["format"], str):
@@ -179,7 +257,7 @@ class JSONParser:
             validated_outcome["delivery"] = "Inline display"
         
         if "success_criteria" in outcome and isinstance(outcome["success_criteria"], list):
-            validated_outcome["success_criteria"] = [str(criteria) for criteria in outcome["success_criteria"]]
+            validated_outcome["success_criteria"] = list(map(self._sanitize_text, map(str, outcome["success_criteria"])))
         else:
             validated_outcome["success_criteria"] = ["Meets user requirements"]
         
@@ -195,74 +273,40 @@ class JSONParser:
             validated_notifications["completion_notice"] = True
         
         if "milestones" in notifications and isinstance(notifications["milestones"], list):
-            validated_notifications["milestones"] = [str(milestone) for milestone in notifications["milestones"]]
+            validated_notifications["milestones"] = list(map(str, notifications["milestones"]))
         else:
             validated_notifications["milestones"] = []
         
         return validated_notifications
     
-    def _sanitize_istvon_content(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Sanitize ISTVON content for safety"""
-        sanitized = {}
-        
-        for key, value in data.items():
-            if key == "I" and isinstance(value, list):
-                sanitized[key] = [self._sanitize_text(item) for item in value]
-            elif key == "T" and isinstance(value, list):
-                sanitized[key] = [self._sanitize_text(item) for item in value]
-            elif key == "O" and isinstance(value, dict) and "success_criteria" in value:
-                sanitized[key] = value.copy()
-                sanitized[key]["success_criteria"] = [self._sanitize_text(criteria) for criteria in value["success_criteria"]]
-            else:
-                sanitized[key] = value
-        
-        return sanitized
-    
     def _sanitize_text(self, text: str) -> str:
         """Sanitize text content"""
         if not isinstance(text, str):
             return str(text)
         
         # Remove potentially harmful characters
-        sanitized = re.sub(r'[<>"\']', '', text)
+        sanitized = text.translate(_STRIP_TABLE)
         
         # Remove excessive whitespace
-        sanitized = re.sub(r'\s+', ' ', sanitized).strip()
+        sanitized = ' '.join(sanitized.split())
         
         return sanitized
     
     def _get_fallback_istvon(self) -> Dict[str, Any]:
         """Get fallback ISTVON structure when parsing fails"""
-        return {
-            "I": ["Execute the requested task effectively"],
-            "S": {"documents": [], "urls": [], "data_points": {}},
-            "T": [],
-            "V": {"tone": "professional", "complexity": "medium"},
-            "O": {
-                "format": "Text response",
-                "delivery": "Inline display",
-                "success_criteria": ["Meets user requirements"]
-            },
-            "N": {"completion_notice": True}
-        }
+        return copy.deepcopy(_FALLBACK_ISTVON)
     
     def is_valid_istvon(self, data: Dict[str, Any]) -> bool:
         """Check if data is valid ISTVON structure"""
-        required_keys = ["I", "O"]
-        
-        # Check required keys
-        if not all(key in data for key in required_keys):
+        # Instructions must be a non-empty list; Outcome a dict with format and delivery
+        if not isinstance(data, dict):
             return False
-        
-        # Check Instructions is list
-        if not isinstance(data["I"], list) or not data["I"]:
-            return False
-        
-        # Check Outcome is dict with required fields
-        if not isinstance(data["O"], dict):
-            return False
-        
-        if "format" not in data["O"] or "delivery" not in data["O"]:
-            return False
-        
-        return True
+        instructions = data.get("I")
+        outcome = data.get("O")
+        return (isinstance(instructions, list) and bool(instructions)
+                and isinstance(outcome, dict)
+                and "format" in outcome and "delivery" in outcome)
+
+
+# Shared parser; JSONParser keeps no per-caller state beyond its parse cache
+default_parser = JSONParser()
@@ -1,91 +1,250 @@
 # utils/logger.py
+import atexit
+import copy
 import logging
+import queue
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from typing import Any, Optional
 import json
+from config import Config
+
+try:
+    import orjson
+    
+    def _dumps_indented(data: Any) -> str:
+        return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+except ImportError:
+    # json.dumps builds a new encoder per call when given options; reuse one instead
+    _JSON_ENCODER = json.JSONEncoder(indent=2, default=str)
+    
+    def _dumps_indented(data: Any) -> str:
+        return _JSON_ENCODER.encode(data)
+
+# Level constants bound once for the isEnabledFor guards below
+_INFO = logging.INFO
+_WARNING = logging.WARNING
+_ERROR = logging.ERROR
+
+# Logger level names resolved once; unknown names fall back to INFO
+_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+
+# Performance metrics are logged in batches of this many entries, or after this many seconds
+_METRICS_FLUSH = 64
+_METRICS_FLUSH_INTERVAL = 5.0
+
+# Most records a file sink buffers before forcing a flush
+_FILE_BATCH = 256
+
+
+class _BatchedFileHandler(logging.FileHandler):
+    """File sink for the queue listener that flushes once per burst of records.
+    
+    Records accumulate in the file buffer and are written out when the queue
+    drains or every _FILE_BATCH records, instead of one flush per record.
+    """
+    
+    def __init__(self, filename: str, log_queue: queue.SimpleQueue):
+        super().__init__(filename, encoding='utf-8')
+        self._log_queue = log_queue
+        self._pending = 0
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= _FILE_BATCH or self._log_queue.empty():
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self) -> None:
+        self._pending = 0
+        super().flush()
+
+
+def _build_formatter() -> logging.Formatter:
+    """The application's record format"""
+    return _DataFormatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+
+def _build_console_handler() -> logging.Handler:
+    """stdout handler for the queue listener"""
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(logging.DEBUG)
+    console_handler.setFormatter(_build_formatter())
+    return console_handler
+
+
+def _build_sink_handler(log_queue: queue.SimpleQueue) -> logging.Handler:
+    """Handler behind the queue listener: a batched file if configured, else stdout"""
+    if Config.LOG_FILE:
+        handler = _BatchedFileHandler(Config.LOG_FILE, log_queue)
+        handler.setLevel(logging.DEBUG)
+        handler.setFormatter(_build_formatter())
+        return handler
+    return _build_console_handler()
+
+
+# Per-record helpers live at module level so calls skip method binding
+def _format_data(data: Any) -> str:
+    """Format data for logging"""
+    try:
+        if isinstance(data, (dict, list)):
+            return _dumps_indented(data)
+        else:
+            return str(data)
+    except Exception:
+        return str(data)
+
+
+# Only these user data keys are ever logged
+_SAFE_USER_KEYS = ("prompt_length", "domain", "complexity", "processing_time")
+
+
+def _sanitize_user_data(data: dict) -> dict:
+    """Sanitize user data for logging"""
+    # Walk the short whitelist rather than every user-supplied key
+    return {key: data[key] for key in _SAFE_USER_KEYS if key in data}
+
+
+class _DataFormatter(logging.Formatter):
+    """Appends a record's istvon_data payload to its message at format time"""
+    
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        data = getattr(record, 'istvon_data', None)
+        if data is not None:
+            record.message = f"{record.message} | Data: {_format_data(data)}"
+        return super().formatMessage(record)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves payload rendering to the listener thread.
+    
+    The message is rendered on the calling thread, as the stock prepare()
+    does, and the data payload is snapshotted with a shallow copy; only its
+    JSON rendering (and any traceback) happens when the sink formats the record.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        data = getattr(record, 'istvon_data', None)
+        if isinstance(data, (dict, list)):
+            record.istvon_data = copy.copy(data)
+        return record
+
+
+# Log calls only enqueue records; a background listener thread does the writes
+_LOG_QUEUE = queue.SimpleQueue()
+_LOG_LISTENER = QueueListener(_LOG_QUEUE, _build_sink_handler(_LOG_QUEUE), respect_handler_level=True)
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
+
+# One handler shared by every Logger; it only enqueues, so there is nothing per-logger to keep
+_SHARED_HANDLER = _DeferredQueueHandler(_LOG_QUEUE)
+
 
 class Logger:
     """Enhanced logging utility for ISTVON application"""
     
+    __slots__ = ('logger', '_debug', '_info', '_warning', '_error', '_critical', '_enabled_for',
+                 '_metrics_buf', '_metrics_since', '_metrics_lock')
+    
     def __init__(self, name: str, level: str = "INFO"):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, level.upper()))
+        self.logger.setLevel(_LEVELS.get(level.upper(), _INFO))
         
         # Prevent duplicate handlers
         if not self.logger.handlers:
-            # Console handler
-            console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setLevel(logging.DEBUG)
-            
-            # Formatter
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                datefmt='%Y-%m-%d %H:%M:%S'
-            )
-            console_handler.setFormatter(formatter)
-            
-            self.logger.addHandler(console_handler)
+            # Hand records to the shared queue; the console handler sits behind the listener
+            self.logger.addHandler(_SHARED_HANDLER)
+        
+        # Bind the per-call logging methods once instead of resolving them on every call
+        self._debug = self.logger.debug
+        self._info = self.logger.info
+        self._warning = self.logger.warning
+        self._error = self.logger.error
+        self._critical = self.logger.critical
+        self._enabled_for = self.logger.isEnabledFor
+        
+        # Created on the first buffered metrics call
+        self._metrics_buf = None
+        self._metrics_since = 0.0
+        self._metrics_lock = threading.Lock()
     
     def debug(self, message: str, data: Optional[Any] = None):
         """Log debug message"""
-        if data is not None:
-            message += f" | Data: {self._format_data(data)}"
-        self.logger.debug(message)
+        # Data rides along on the record and is only rendered when a handler formats it
+        self._debug(message, extra={'istvon_data': data} if data is not None else None)
     
     def info(self, message: str, data: Optional[Any] = None):
         """Log info message"""
-        if data is not None:
-            message += f" | Data: {self._format_data(data)}"
-        self.logger.info(message)
+        self._info(message, extra={'istvon_data': data} if data is not None else None)
     
     def warning(self, message: str, data: Optional[Any] = None):
         """Log warning message"""
-        if data is not None:
-            message += f" | Data: {self._format_data(data)}"
-        self.logger.warning(message)
+        self._warning(message, extra={'istvon_data': data} if data is not None else None)
     
     def error(self, message: str, data: Optional[Any] = None):
         """Log error message"""
-        if data is not None:
-            message += f" | Data: {self._format_data(data)}"
-        self.logger.error(message)
+        self._error(message, extra={'istvon_data': data} if data is not None else None)
     
     def critical(self, message: str, data: Optional[Any] = None):
         """Log critical message"""
-        if data is not None:
-            message += f" | Data: {self._format_data(data)}"
-        self.logger.critical(message)
+        self._critical(message, extra={'istvon_data': data} if data is not None else None)
     
-    def _format_data(self, data: Any) -> str:
-        """Format data for logging"""
-        try:
-            if isinstance(data, (dict, list)):
-                return json.dumps(data, indent=2, default=str)
-            else:
-                return str(data)
-        except Exception:
-            return str(data)
+    _format_data = staticmethod(_format_data)
     
     def log_istvon_processing(self, prompt: str, result: dict, processing_time: float):
         """Log ISTVON processing details"""
-        self.info("ISTVON Processing", {
-            "prompt_length": len(prompt),
-            "processing_time_ms": processing_time,
-            "success": result.get("success", False),
-            "domain": result.get("context", {}).get("domain", "unknown")
-        })
+        if not self._enabled_for(_INFO):
+            return
+        context = result.get("context")
+        domain = context.get("domain", "unknown") if context else "unknown"
+        
+        # %-style args: logging only renders the string when a handler formats the record
+        self._info(
+            "ISTVON Processing | prompt_length=%s processing_time_ms=%s success=%s domain=%s",
+            len(prompt),
+            processing_time,
+            result.get("success", False),
+            domain
+        )
     
     def log_broker_decision(self, decision: str, analysis: dict):
         """Log broker decision details"""
-        self.info("Broker Decision", {
-            "decision": decision,
-            "risk_level": analysis.get("safety_analysis", {}).get("risk_level", "unknown"),
-            "completeness_score": analysis.get("costar_gaps", {}).get("completeness_score", 0)
-        })
+        if not self._enabled_for(_INFO):
+            return
+        safety = analysis.get("safety_analysis")
+        gaps = analysis.get("costar_gaps")
+        
+        self._info(
+            "Broker Decision | decision=%s risk_level=%s completeness_score=%s",
+            decision,
+            safety.get("risk_level", "unknown") if safety else "unknown",
+            gaps.get("completeness_score", 0) if gaps else 0
+        )
     
     def log_api_call(self, endpoint: str, success: bool, response_time: float, error: Optional[str] = None):
         """Log API call details"""
+        if not self._enabled_for(_INFO if success else _ERROR):
+            return
         if success:
             self.info("API Call Success", {
                 "endpoint": endpoint,
@@ -100,12 +259,18 @@ class Logger:
     
     def log_safety_analysis(self, prompt: str, safety_result: dict):
         """Log safety analysis results"""
-        if safety_result.get("is_safe", True):
-            self.info("Safety Analysis: Safe", {
-                "risk_level": safety_result.get("risk_level", "low"),
-                "issues_count": len(safety_result.get("issues", []))
-            })
+        is_safe = safety_result.get("is_safe", True)
+        if not self._enabled_for(_INFO if is_safe else _WARNING):
+            return
+        
+        if is_safe:
+            self._info(
+                "Safety Analysis: Safe | risk_level=%s issues_count=%s",
+                safety_result.get("risk_level", "low"),
+                len(safety_result.get("issues") or ())
+            )
         else:
+            # Issue details stay structured on the (rare) unsafe path
             self.warning("Safety Analysis: Unsafe", {
                 "risk_level": safety_result.get("risk_level", "unknown"),
                 "issues": safety_result.get("issues", [])
@@ -129,24 +294,46 @@ class Logger:
             self.error(f"Database {operation} Failed", {"record_id": record_id})
     
     def log_performance_metrics(self, metrics: dict):
-        """Log performance metrics"""
-        self.info("Performance Metrics", metrics)
+        """Log performance metrics, buffered and emitted in batches.
+        
+        A batch is flushed once it holds _METRICS_FLUSH entries, or when a call
+        arrives _METRICS_FLUSH_INTERVAL seconds after the batch started; there
+        is no timer, so a quiet logger holds its batch until the next call,
+        flush_metrics() or interpreter exit.
+        """
+        if not self._enabled_for(_INFO):
+            return
+        with self._metrics_lock:
+            if self._metrics_buf is None:
+                self._metrics_buf = []
+                atexit.register(self.flush_metrics)
+            if not self._metrics_buf:
+                self._metrics_since = time.monotonic()
+            
+            # Copy so later changes by the caller don't alter what gets logged
+            self._metrics_buf.append(dict(metrics))
+            flush = (len(self._metrics_buf) >= _METRICS_FLUSH
+                     or time.monotonic() - self._metrics_since >= _METRICS_FLUSH_INTERVAL)
+        if flush:
+            self.flush_metrics()
+    
+    def flush_metrics(self):
+        """Log any buffered performance metrics as a single batch"""
+        with self._metrics_lock:
+            batch = self._metrics_buf
+            if not batch:
+                return
+            self._metrics_buf = []
+        self.info("Performance Metrics Batch", batch)
     
     def log_user_action(self, action: str, user_data: dict):
         """Log user actions (sanitized)"""
+        if not self._enabled_for(_INFO):
+            return
         sanitized_data = self._sanitize_user_data(user_data)
         self.info(f"User Action: {action}", sanitized_data)
     
-    def _sanitize_user_data(self, data: dict) -> dict:
-        """Sanitize user data for logging"""
-        sanitized = {}
-        safe_keys = ["prompt_length", "domain", "complexity", "processing_time"]
-        
-        for key, value in data.items():
-            if key in safe_keys:
-                sanitized[key] = value
-        
-        return sanitized
+    _sanitize_user_data = staticmethod(_sanitize_user_data)
 
 # Global logger instances
 app_logger = Logger("ISTVONApp")